@@ -1,69 +1,185 @@
 import os
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Twitch Configuration
-TWITCH_TOKEN = os.getenv("TWITCH_TOKEN", "")
-TWITCH_CLIENT_ID = os.getenv("TWITCH_CLIENT_ID", "")
-TWITCH_CLIENT_SECRET = os.getenv("TWITCH_CLIENT_SECRET", "")
-TWITCH_CHANNEL = os.getenv("TWITCH_CHANNEL", "")
-TWITCH_MASTER_USER = os.getenv("TWITCH_MASTER_USER", "")
-
-# Discord Configuration
-DISCORD_TOKEN = os.getenv("DISCORD_TOKEN", "")
-DISCORD_GUILD = os.getenv("DISCORD_GUILD", "")
-DISCORD_CHANNELS = os.getenv("DISCORD_CHANNELS", "").split(",")
-DISCORD_MASTER_USER = os.getenv("DISCORD_MASTER_USER", "")
-
-# Ollama Configuration
-OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama2")
-
-# Enhanced AI Configuration
-AI_PERSONAS = {
-    "default": "Eres un asistente útil integrado con un bot de Twitch y Discord. Mantén tus respuestas concisas, amigables y apropiadas para plataformas de streaming.",
-    "streamer": "Eres una personalidad de streaming carismática y entretenida. Tus respuestas deben ser enérgicas, atractivas y divertidas.",
-    "expert": "Eres un experto con conocimientos que proporciona información precisa y detallada mientras mantiene un tono profesional.",
-    "comedian": "Eres un comediante ingenioso con un sentido del humor desenfadado. Tus respuestas deben ser divertidas pero apropiadas para todo tipo de público.",
-    "motivator": "Eres un motivador inspirador que ofrece mensajes alentadores y de apoyo.",
-}
+import functools
+import json
+from typing import Annotated, FrozenSet
+from dotenv import dotenv_values, find_dotenv
+from pydantic import field_validator
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 
 # Language settings
-LANGUAGE = os.getenv("LANGUAGE", "spanish").lower()
 SUPPORTED_LANGUAGES = ["english", "spanish"]
 
-# Language-specific system prompts with stronger instructions
-LANGUAGE_PROMPTS = {
-    "english": "IMPORTANT: You must ALWAYS respond in English, regardless of the language of the input. Do NOT translate your responses to any other language. Your responses should be in grammatically correct and natural-sounding English.",
-    "spanish": "IMPORTANTE: Debes SIEMPRE responder en español, sin importar el idioma de la entrada. NO traduzcas tus respuestas a ningún otro idioma. Tus respuestas deben estar en español gramaticalmente correcto y natural."
-}
+# Persona names and prompt dictionaries loaded from config._persona_text on first access by __getattr__
+_LAZY_PERSONA_TEXT = ("Persona", "AI_PERSONAS", "LANGUAGE_PROMPTS")
 
-# Get current AI persona with default fallback
-DEFAULT_PERSONA = os.getenv("DEFAULT_PERSONA", "default")
-if DEFAULT_PERSONA not in AI_PERSONAS:
-    DEFAULT_PERSONA = "default"
+# Directory holding the knowledge files, at the project root
+KNOWLEDGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "knowledge")
 
-# Memory and Vector Database Configuration
-ENABLE_VECTOR_MEMORY = os.getenv("ENABLE_VECTOR_MEMORY", "True").lower() == "true"
-MEMORY_DATABASE_PATH = os.getenv("MEMORY_DATABASE_PATH", "data/memory")
+# Memory collection names
 MEMORY_COLLECTION_CONVERSATIONS = "conversations"
 MEMORY_COLLECTION_KNOWLEDGE = "knowledge"
-MEMORY_EMBEDDING_MODEL = os.getenv("MEMORY_EMBEDDING_MODEL", "paraphrase-multilingual-MiniLM-L12-v2")
-MEMORY_SIMILARITY_THRESHOLD = float(os.getenv("MEMORY_SIMILARITY_THRESHOLD", "0.75"))  # Threshold for considering content similar
-MEMORY_MAX_RESULTS = int(os.getenv("MEMORY_MAX_RESULTS", "5"))  # Max results to return from memory search
-
-# Context awareness settings
-MEMORY_SIZE = int(os.getenv("MEMORY_SIZE", "10"))  # Number of past messages to remember per conversation
-CHANNEL_CONTEXT_ENABLED = os.getenv("CHANNEL_CONTEXT_ENABLED", "True").lower() == "true"
-GLOBAL_CONTEXT_SIZE = int(os.getenv("GLOBAL_CONTEXT_SIZE", "5"))  # Number of recent channel messages to consider
-
-# Bot Configuration
-BOT_PREFIX = os.getenv("BOT_PREFIX", "!")
-ENABLE_AI_RESPONSE = os.getenv("ENABLE_AI_RESPONSE", "True").lower() == "true"
-AI_TRIGGER_PHRASE = os.getenv("AI_TRIGGER_PHRASE", "@bot")
-AI_RESPONSE_PROBABILITY = float(os.getenv("AI_RESPONSE_PROBABILITY", "0.1"))  # 10% chance by default
-
-# NLP and Intent Detection Configuration
-ENABLE_INTENT_DETECTION = os.getenv("ENABLE_INTENT_DETECTION", "True").lower() == "true"  # Enable advanced NLP intent detection
\ No newline at end of file
+
+# Set once the .env file has been loaded into this process environment
+_DOTENV_SENTINEL = "_DOTENV_LOADED"
+
+# Parsed .env values are cached as JSON next to the .env file, readable by the owner only
+# (they hold the bot tokens); bump the version when the cache format changes
+_ENV_CACHE_SUFFIX = ".cache.json"
+_ENV_CACHE_VERSION = 2
+_ENV_CACHE_MODE = 0o600
+
+# Pickle cache written by earlier versions; removed so the tokens it holds do not linger
+_LEGACY_ENV_CACHE_SUFFIX = ".cache.pkl"
+
+
+class Config(BaseSettings):
+    """Environment-driven settings, parsed and validated once per process by get_config()."""
+
+    model_config = SettingsConfigDict(frozen=True, extra="ignore")
+
+    # Twitch Configuration
+    twitch_token: str = ""
+    twitch_client_id: str = ""
+    twitch_client_secret: str = ""
+    twitch_channel: str = ""
+    twitch_master_user: str = ""
+
+    # Discord Configuration
+    discord_token: str = ""
+    discord_guild: str = ""
+    discord_channels: Annotated[FrozenSet[str], NoDecode] = frozenset()  # Comma-separated in the environment
+    discord_master_user: str = ""
+
+    # Ollama Configuration
+    ollama_base_url: str = "http://localhost:11434"
+    ollama_model: str = "llama2"
+    ollama_max_concurrency: int = 4  # Requests sent to Ollama at once; the rest wait their turn
+
+    # Language and persona settings
+    language: str = "spanish"
+    default_persona: str = "default"
+
+    # Memory and Vector Database Configuration
+    enable_vector_memory: bool = True
+    memory_database_path: str = "data/memory"
+    memory_embedding_model: str = "paraphrase-multilingual-MiniLM-L12-v2"
+    memory_similarity_threshold: float = 0.75  # Threshold for considering content similar
+    memory_max_results: int = 5  # Max results to return from memory search
+
+    # Semantic response cache (reuses replies for near-identical messages)
+    enable_semantic_cache: bool = False
+    semantic_cache_threshold: float = 0.92  # Cosine similarity needed to reuse a reply
+    semantic_cache_size: int = 2048  # Replies kept per persona/language/knowledge combination
+    knowledge_top_k: int = 0  # When > 0, send only this many relevant knowledge chunks per message
+
+    # Context awareness settings
+    memory_size: int = 10  # Number of past messages to remember per conversation
+    channel_context_enabled: bool = True
+    global_context_size: int = 5  # Number of recent channel messages to consider
+
+    # Bot Configuration
+    bot_prefix: str = "!"
+    enable_ai_response: bool = True
+    ai_trigger_phrase: str = "@bot"
+    ai_response_probability: float = 0.1  # 10% chance by default
+
+    # NLP and Intent Detection Configuration
+    enable_intent_detection: bool = True  # Enable advanced NLP intent detection
+
+    @field_validator("discord_channels", mode="before")
+    @classmethod
+    def _split_channels(cls, value):
+        """Split the comma-separated DISCORD_CHANNELS value, dropping blanks and whitespace."""
+        if isinstance(value, str):
+            return frozenset(name.strip() for name in value.split(",") if name.strip())
+        return value
+
+    @field_validator("language", mode="before")
+    @classmethod
+    def _normalize_language(cls, value):
+        """Normalize the language name to lowercase."""
+        return value.lower() if isinstance(value, str) else value
+
+    @field_validator("default_persona")
+    @classmethod
+    def _fallback_persona(cls, value):
+        """Fall back to the default persona when the configured one is unknown."""
+        # Imported here so config.config does not load the persona text; runs once per process
+        from config._persona_text import AI_PERSONAS
+        return value if value in AI_PERSONAS else "default"
+
+
+def _read_env_cache(env_path: str, cache_path: str):
+    """Return the cached .env values, or None if the cache is missing or older than .env."""
+    try:
+        if os.path.getmtime(cache_path) < os.path.getmtime(env_path):
+            return None
+        with open(cache_path, "rb") as f:
+            version, values = json.loads(f.read())
+    except (OSError, ValueError, TypeError):
+        return None
+    if version != _ENV_CACHE_VERSION or not isinstance(values, dict):
+        return None
+    return values
+
+
+def _write_env_cache(cache_path: str, values: dict):
+    """Save the parsed .env values as JSON, readable by the owner only, so later starts can skip parsing."""
+    try:
+        fd = os.open(cache_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, _ENV_CACHE_MODE)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            if hasattr(os, "fchmod"):
+                os.fchmod(f.fileno(), _ENV_CACHE_MODE)  # A cache created by an older version may be wider
+            json.dump([_ENV_CACHE_VERSION, values], f)
+    except OSError:
+        pass  # The cache is only an optimization (e.g. read-only deployments)
+
+
+@functools.cache
+def _ensure_env_loaded() -> bool:
+    """Load environment variables from the .env file exactly once per process."""
+    if os.environ.get(_DOTENV_SENTINEL):
+        return True
+
+    env_path = find_dotenv()
+    if env_path:
+        cache_path = env_path + _ENV_CACHE_SUFFIX
+        values = _read_env_cache(env_path, cache_path)
+        if values is None:
+            values = dotenv_values(env_path)
+            _write_env_cache(cache_path, values)
+            try:
+                os.remove(env_path + _LEGACY_ENV_CACHE_SUFFIX)
+            except OSError:
+                pass
+
+        # Like load_dotenv(), never override variables already set in the environment
+        for key, value in values.items():
+            if value is not None:
+                os.environ.setdefault(key, value)
+
+    os.environ[_DOTENV_SENTINEL] = "1"
+    return True
+
+
+@functools.lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Build the configuration from the environment once and cache it."""
+    _ensure_env_loaded()
+    return Config()
+
+
+_CONFIG_FIELDS = frozenset(Config.model_fields)
+
+
+def __getattr__(name):
+    """Expose config fields as module constants (e.g. TWITCH_TOKEN) backed by get_config()."""
+    if name in _LAZY_PERSONA_TEXT:
+        from config import _persona_text
+        table = getattr(_persona_text, name)
+        globals()[name] = table  # Cache so later lookups skip __getattr__
+        return table
+    attr = name.lower()
+    if name.isupper() and attr in _CONFIG_FIELDS:
+        return getattr(get_config(), attr)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
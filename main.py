@@ -1,11 +1,6 @@
 import asyncio
 import logging
-import os
 import sys
-from dotenv import load_dotenv
-from src.twitch_bot import TwitchBot
-from src.discord_bot import DiscordBot
-from src.ollama_integration import OllamaClient
 from config.config import TWITCH_TOKEN, DISCORD_TOKEN
 
 # Configure logging
@@ -15,14 +10,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+class AIHealthCheckError(Exception):
+    """Raised when the Ollama API fails the startup health check."""
 
 async def check_ai_health():
-    """Check if the Ollama API is responsive before starting the bots."""
+    """Check if the Ollama API is responsive while the bots start up."""
     logger.info("Performing AI health check...")
-    client = OllamaClient()
-    is_healthy, message = await client.health_check()
+    from src.ollama_integration import OllamaClient
+    async with OllamaClient() as client:
+        is_healthy, message = await client.health_check()
     
     if not is_healthy:
         logger.error(f"AI health check failed: {message}")
@@ -32,29 +28,66 @@ async def check_ai_health():
     logger.info(f"AI health check passed: {message}")
     return True
 
-async def main():
-    """Main function to run both Twitch and Discord bots."""
-    # First, check if the AI backend is responsive
+async def require_ai_health():
+    """Run the AI health check, raising AIHealthCheckError if it fails."""
     if not await check_ai_health():
-        logger.error("AI backend is not accessible. Exiting...")
-        sys.exit(1)
+        raise AIHealthCheckError("AI backend is not accessible")
+
+async def run_supervised(coros, closers=()):
+    """
+    Run coroutines concurrently, cancelling the rest as soon as one of them fails.
+    
+    Args:
+        coros: The coroutines to run
+        closers: Coroutine functions awaited after cancellation, e.g. each bot's close(),
+            since cancelling a bot task does not close its connections
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        # Cancel surviving tasks and wait for them so shutdown is deterministic
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
+        # Close the Discord gateway and Twitch IRC connections before exiting
+        for close in closers:
+            try:
+                await close()
+            except Exception as e:
+                logger.error(f"Error closing bot connection: {e}")
         
-    # Create task list
+    for task in done:
+        if not task.cancelled() and task.exception() is not None:
+            raise task.exception()
+
+async def main():
+    """Main function to run both Twitch and Discord bots."""
+    # Create task list, and the close() of each bot for shutdown
     tasks = []
+    closers = []
 
     # Initialize and run Twitch bot if token is available
     if TWITCH_TOKEN:
         logger.info("Starting Twitch bot...")
+        # Imported here so Discord-only deployments never load twitchio
+        from src.twitch_bot import TwitchBot
         twitch_bot = TwitchBot()
         tasks.append(twitch_bot.start())
+        closers.append(twitch_bot.close)
     else:
         logger.warning("Twitch token not found. Twitch bot will not start.")
 
     # Initialize and run Discord bot if token is available
     if DISCORD_TOKEN:
         logger.info("Starting Discord bot...")
+        # Imported here so Twitch-only deployments never load discord.py
+        from src.discord_bot import DiscordBot
         discord_bot = DiscordBot()
         tasks.append(discord_bot.start(DISCORD_TOKEN))
+        closers.append(discord_bot.close)
     else:
         logger.warning("Discord token not found. Discord bot will not start.")
 
@@ -63,12 +96,19 @@ async def main():
         logger.error("No bot tokens found. Please configure your .env file with bot credentials.")
         return
 
-    # Run all bots concurrently
+    # Run all bots concurrently; if one of them dies the others are stopped too.
+    # The AI health check runs alongside so its round trip overlaps the gateway handshakes.
     try:
-        await asyncio.gather(*tasks)
+        await run_supervised([require_ai_health(), *tasks], closers)
+    except AIHealthCheckError:
+        logger.error("AI backend is not accessible. Exiting...")
+        sys.exit(1)
     except Exception as e:
         logger.error(f"Error running bots: {e}")
     finally:
+        # The bots share one message handler; release its pooled Ollama connections
+        from utils.message_handler import MessageHandler
+        await MessageHandler.aclose()
         logger.info("Bot execution complete.")
 
 if __name__ == "__main__":
@@ -2,10 +2,9 @@
 Console interface for interacting with the bot directly from the terminal.
 """
 import asyncio
+import functools
 import logging
 import os
-import sys
-import readline  # Enables command history and editing capabilities
 import socket
 import getpass
 from prompt_toolkit import PromptSession
@@ -13,10 +12,32 @@ from prompt_toolkit.history import FileHistory
 from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
 from prompt_toolkit.completion import WordCompleter
 from utils.message_handler import MessageHandler
-from config.config import BOT_PREFIX, AI_PERSONAS, SUPPORTED_LANGUAGES
+from config.config import BOT_PREFIX, AI_PERSONAS
 
 logger = logging.getLogger(__name__)
 
+# Console-only commands handled before the message handler
+_CONSOLE_COMMANDS = ("exit", "quit", "clear")
+_EXIT_COMMANDS = frozenset(("exit", "quit"))
+
+@functools.lru_cache(maxsize=4)
+def _make_completer(prefix, commands):
+    """Build the prompt completer for the given prefix and command names, shared across sessions."""
+    return WordCompleter(
+        tuple(f"{prefix}{cmd}" for cmd in commands) + _CONSOLE_COMMANDS,
+        ignore_case=True
+    )
+
+@functools.cache
+def _session_username():
+    """Get the username for the console session, resolved once per process."""
+    try:
+        username = getpass.getuser()
+        hostname = socket.gethostname()
+        return f"{username}@{hostname}"
+    except Exception:
+        return "console_user"
+
 class ConsoleBot:
     """A console interface for interacting with the bot directly."""
     
@@ -25,17 +46,14 @@ class ConsoleBot:
         self.message_handler = MessageHandler()
         self.running = False
         self.console_id = "console"  # Channel ID for the console
-        self.username = self._get_username()
+        self.username = _session_username()
         
         # Set up command completion
-        self.commands = list(self.message_handler.commands.keys())
-        self.command_completer = WordCompleter(
-            [f"{BOT_PREFIX}{cmd}" for cmd in self.commands] + ["exit", "quit", "clear"],
-            ignore_case=True
-        )
+        self.commands = tuple(self.message_handler.commands)
+        self.command_completer = _make_completer(BOT_PREFIX, self.commands)
         
         # Set up persona completion
-        self.personas = list(AI_PERSONAS.keys())
+        self.personas = tuple(AI_PERSONAS)
         
         # Set up history file
         history_dir = os.path.join(os.path.expanduser("~"), ".bo7")
@@ -49,15 +67,6 @@ class ConsoleBot:
             completer=self.command_completer
         )
         
-    def _get_username(self):
-        """Get the username for the console session."""
-        try:
-            username = getpass.getuser()
-            hostname = socket.gethostname()
-            return f"{username}@{hostname}"
-        except:
-            return "console_user"
-    
     async def start(self):
         """Start the console bot interface."""
         self.running = True
@@ -76,12 +85,14 @@ class ConsoleBot:
                 user_input = await self.session.prompt_async(f"{self.username}> ")
                 
                 # Process special console commands
-                if user_input.lower() in ["exit", "quit"]:
+                lowered = user_input.strip().lower()
+                if lowered in _EXIT_COMMANDS:
                     self.running = False
                     print("Exiting console...")
                     break
-                elif user_input.lower() == "clear":
-                    os.system("cls" if os.name == "nt" else "clear")
+                elif lowered == "clear":
+                    # Clear the screen and move the cursor home with ANSI escapes
+                    print("\x1b[2J\x1b[H", end="", flush=True)
                     continue
                 
                 # Process the message and get a response
@@ -108,10 +119,13 @@ class ConsoleBot:
             except Exception as e:
                 logger.error(f"Error in console: {e}")
                 print(f"\nError: {e}\n")
+        
+        await self.stop()
                 
     async def stop(self):
         """Stop the console bot."""
         self.running = False
+        await self.message_handler.ollama_client.aclose()
         
 # Command-line execution
 if __name__ == "__main__":
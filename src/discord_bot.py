@@ -1,11 +1,8 @@
+import asyncio
 import logging
 import discord
 from discord.ext import commands
-import traceback
-import sys
 from config.config import (
-    DISCORD_TOKEN,
-    DISCORD_GUILD,
     BOT_PREFIX,
     AI_TRIGGER_PHRASE
 )
@@ -13,17 +10,95 @@ from utils.message_handler import MessageHandler
 
 logger = logging.getLogger(__name__)
 
+# Streaming edits are debounced to stay well under Discord's per-channel edit ratelimit
+EDIT_MIN_INTERVAL = 1.0  # Seconds between edits of a streamed response
+EDIT_MIN_CHARS = 200  # New characters needed before an edit
+
+# Discord channel IDs are stable snowflakes, so their string form never changes
+_channel_id_strings = {}
+
+def _channel_id_str(channel):
+    """Return the channel ID as a string, reusing the cached conversion."""
+    channel_id = _channel_id_strings.get(channel.id)
+    if channel_id is None:
+        channel_id = _channel_id_strings[channel.id] = str(channel.id)
+    return channel_id
+
+# Discord command name -> MessageHandler method that implements it
+_COMMAND_HANDLERS = {
+    "help": "command_help",
+    "ping": "command_ping",
+    "ai": "command_ai",
+    "persona": "command_persona",
+    "personas": "command_list_personas",
+    "ask": "command_ask_as_persona",
+    "language": "command_language",
+    "languages": "command_list_languages",
+}
+
+class BotCommands(commands.Cog):
+    """Prefix commands for the Discord bot, forwarded to the shared message handler."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def _dispatch(self, ctx, args=""):
+        """Run the message handler method for the invoked command and send its response, skipping empty replies."""
+        handler = getattr(self.bot.message_handler, _COMMAND_HANDLERS[ctx.command.name])
+        response = await handler(args, ctx.author.name, _channel_id_str(ctx.channel), "discord")
+        if response:
+            await ctx.send(response)
+
+    @commands.command(name="help")
+    async def help_command(self, ctx):
+        """Show help information"""
+        await self._dispatch(ctx)
+        
+    @commands.command(name="ping")
+    async def ping_command(self, ctx):
+        """Check if the bot is online"""
+        await self._dispatch(ctx)
+        
+    @commands.command(name="ai")
+    async def ai_command(self, ctx, *, message=""):
+        """Ask the AI a question"""
+        await self._dispatch(ctx, message)
+        
+    @commands.command(name="persona")
+    async def persona_command(self, ctx, *, persona_name=""):
+        """Change the bot's persona"""
+        await self._dispatch(ctx, persona_name)
+        
+    @commands.command(name="personas")
+    async def personas_command(self, ctx):
+        """List available personas"""
+        await self._dispatch(ctx)
+        
+    @commands.command(name="ask")
+    async def ask_command(self, ctx, persona_name, *, message):
+        """Ask a question to a specific persona"""
+        await self._dispatch(ctx, f"{persona_name} {message}")
+        
+    @commands.command(name="language")
+    async def language_command(self, ctx, *, language_name=""):
+        """Change the bot's language"""
+        await self._dispatch(ctx, language_name)
+        
+    @commands.command(name="languages")
+    async def languages_command(self, ctx):
+        """List available languages"""
+        await self._dispatch(ctx)
+
 class DiscordBot(commands.Bot):
     def __init__(self):
         # Initialize message handler
         self.message_handler = MessageHandler()
         
-        # Initialize Discord.py bot with all intents
+        # Initialize Discord.py bot with only the intents it uses (no privileged members intent)
         intents = discord.Intents.default()
         intents.message_content = True  # Explicitly enable message content intent
         intents.guilds = True
         intents.guild_messages = True
-        intents.members = True
         
         logger.info("Initializing Discord bot with prefix '%s' and AI trigger '%s'", 
                    BOT_PREFIX, AI_TRIGGER_PHRASE)
@@ -34,74 +109,57 @@ class DiscordBot(commands.Bot):
             help_command=None  # Disable default help command
         )
         
-        # Add error handler
-        self.on_command_error = self.handle_command_error
+        # Keep the prefix on the instance for the per-message command check
+        self._prefix = BOT_PREFIX
         
-        # Register commands using decorators
-        @self.command(name="help")
-        async def help_command(ctx):
-            """Show help information"""
-            response = await self.message_handler.command_help("", ctx.author.name, str(ctx.channel.id), "discord")
-            await ctx.send(response)
-            
-        @self.command(name="ping")
-        async def ping_command(ctx):
-            """Check if the bot is online"""
-            response = await self.message_handler.command_ping("", ctx.author.name, str(ctx.channel.id), "discord")
-            await ctx.send(response)
-            
-        @self.command(name="ai")
-        async def ai_command(ctx, *, message=""):
-            """Ask the AI a question"""
-            response = await self.message_handler.command_ai(message, ctx.author.name, str(ctx.channel.id), "discord")
-            await ctx.send(response)
-            
-        @self.command(name="persona")
-        async def persona_command(ctx, *, persona_name=""):
-            """Change the bot's persona"""
-            response = await self.message_handler.command_persona(persona_name, ctx.author.name, str(ctx.channel.id), "discord")
-            await ctx.send(response)
-            
-        @self.command(name="personas")
-        async def personas_command(ctx):
-            """List available personas"""
-            response = await self.message_handler.command_list_personas("", ctx.author.name, str(ctx.channel.id), "discord")
-            await ctx.send(response)
-            
-        @self.command(name="ask")
-        async def ask_command(ctx, persona_name, *, message):
-            """Ask a question to a specific persona"""
-            args = f"{persona_name} {message}"
-            response = await self.message_handler.command_ask_as_persona(args, ctx.author.name, str(ctx.channel.id), "discord")
-            await ctx.send(response)
-            
-        @self.command(name="language")
-        async def language_command(ctx, *, language_name=""):
-            """Change the bot's language"""
-            response = await self.message_handler.command_language(language_name, ctx.author.name, str(ctx.channel.id), "discord")
-            await ctx.send(response)
-            
-        @self.command(name="languages")
-        async def languages_command(ctx):
-            """List available languages"""
-            response = await self.message_handler.command_list_languages("", ctx.author.name, str(ctx.channel.id), "discord")
-            await ctx.send(response)
+        # Cached send-message permission per (guild_id, channel_id), invalidated by update events
+        # and dropped when Discord refuses a send (e.g. the bot lost a role, which raises no event)
+        self._send_perm_cache = {}
+        
+        # The bot's own user ID, captured in on_ready for the self-message check
+        self._user_id = None
     
-    async def handle_command_error(self, ctx, error):
+    async def on_command_error(self, ctx, error):
         """Handle command errors and log them."""
-        logger.error("Command error: %s", error)
-        logger.error(''.join(traceback.format_exception(type(error), error, error.__traceback__)))
+        # Not inside an except block, so pass the error for the traceback explicitly
+        logger.error("Command error: %s", error, exc_info=error)
         await ctx.send(f"Error al ejecutar el comando: {error}")
     
+    def _can_send(self, channel, guild):
+        """Return whether the bot can send messages in a guild channel, using the permission cache."""
+        key = (guild.id, channel.id)
+        can_send = self._send_perm_cache.get(key)
+        if can_send is None:
+            can_send = channel.permissions_for(guild.me).send_messages
+            # Only grants are cached: without the members intent there is no event
+            # when the bot gains a role, so denials are re-checked on every message
+            if can_send:
+                self._send_perm_cache[key] = can_send
+        return can_send
+    
+    def _forget_send_permission(self, channel):
+        """Drop the cached send permission of a channel where Discord refused a send."""
+        guild = getattr(channel, 'guild', None)
+        if guild is not None:
+            self._send_perm_cache.pop((guild.id, channel.id), None)
+    
+    def _invalidate_guild_permissions(self, guild_id):
+        """Drop cached send permissions for every channel in a guild."""
+        for key in [key for key in self._send_perm_cache if key[0] == guild_id]:
+            del self._send_perm_cache[key]
+    
     async def setup_hook(self):
         """Called when the bot is setting up."""
         logger.info("Bot setup hook running...")
+        # Register the prefix commands
+        await self.add_cog(BotCommands(self))
         # Log that we're listening for events
         logger.info("Event listeners are now registered and active")
         
     async def on_ready(self):
         """Event triggered when the bot is connected and ready."""
-        logger.info("Discord Bot is connected as %s (ID: %s)", self.user.name, self.user.id)
+        self._user_id = self.user.id
+        logger.info("Discord Bot is connected as %s (ID: %s)", self.user.name, self._user_id)
         
         # Set bot activity status
         await self.change_presence(activity=discord.Activity(
@@ -109,6 +167,9 @@ class DiscordBot(commands.Bot):
             name=f"{BOT_PREFIX}help"
         ))
         
+        # Permissions may have changed while disconnected
+        self._send_perm_cache.clear()
+        
         # Log connected guilds
         guild_names = [guild.name for guild in self.guilds]
         logger.info("Connected to %d guilds: %s", len(guild_names), ', '.join(guild_names))
@@ -117,71 +178,74 @@ class DiscordBot(commands.Bot):
         for guild in self.guilds:
             logger.info("Guild: %s (ID: %s)", guild.name, guild.id)
             text_channels = [channel for channel in guild.channels if isinstance(channel, discord.TextChannel)]
-            logger.info("Text channels in %s: %s", guild.name, 
-                       ', '.join([f"#{channel.name} (ID: {channel.id})" for channel in text_channels]))
             
-            # Check for channels where the bot has permission to send messages
-            authorized_channels = []
+            # Check for channels where the bot has permission to send messages, warming the cache
+            me = guild.me
+            authorized_count = 0
             for channel in text_channels:
-                permissions = channel.permissions_for(guild.me)
-                if permissions.send_messages:
-                    authorized_channels.append(channel)
-                    logger.info("Bot has permission to send messages in #%s", channel.name)
+                if channel.permissions_for(me).send_messages:
+                    self._send_perm_cache[(guild.id, channel.id)] = True
+                    authorized_count += 1
                 else:
-                    logger.warning("Bot lacks permission to send messages in #%s", channel.name)
+                    logger.debug("Bot lacks permission to send messages in #%s", channel.name)
+            logger.info("Bot can send messages in %d of %d text channels in %s",
+                       authorized_count, len(text_channels), guild.name)
             
             # No longer sending test messages when bot connects
-            if not authorized_channels:
+            if not authorized_count:
                 logger.warning("Bot doesn't have permission to send messages in any channel in %s", guild.name)
                 logger.warning("Please update the bot's permissions in the Discord server settings")
         
     async def on_message(self, message):
         """Event triggered for every message in channels the bot can see."""
         try:
-            # More detailed logging for received messages
-            channel_name = getattr(message.channel, 'name', 'DM')
-            logger.info("RECEIVED MESSAGE: Author: %s, Channel: #%s, Content: '%s'", 
-                       message.author.name, channel_name, message.content)
-            
-            # Ignore messages from the bot itself
-            if message.author == self.user:
-                logger.info("Ignoring message from self")
+            # Ignore messages from the bot itself before doing any other work
+            if message.author.id == self._user_id:
                 return
             
+            channel_name = getattr(message.channel, 'name', 'DM')
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("RECEIVED MESSAGE: Author: %s, Channel: #%s, Content: '%s'", 
+                            message.author.name, channel_name, message.content)
+            
             # Check if this is a direct message (DM)
             is_dm = isinstance(message.channel, discord.DMChannel)
             
             # For guild messages, check if bot has permission to send messages
             if not is_dm:
-                permissions = message.channel.permissions_for(message.guild.me)
-                if not permissions.send_messages:
+                if not self._can_send(message.channel, message.guild):
                     logger.warning("Received message in #%s but bot lacks permission to respond", channel_name)
                     return
             
-            # Process commands first
-            ctx = await self.get_context(message)
-            if ctx.valid:
-                logger.info("Processing as command: %s", message.content)
-                await self.invoke(ctx)
+            content = message.content
+            
+            # Only prefixed messages can be commands, so regular chat skips command parsing
+            if content.startswith(self._prefix):
+                ctx = await self.get_context(message)
+                if ctx.valid:
+                    logger.info("Processing as command: %s", content)
+                    await self.invoke(ctx)
                 return
             
-            # Only process non-command messages
-            if not message.content.startswith(BOT_PREFIX):
-                username = message.author.name
-                channel_id = str(message.channel.id)
-                content = message.content
+            username = message.author.name
+            channel_id = _channel_id_str(message.channel)
+            
+            logger.info("Processing non-command message from %s in #%s", username, channel_name)
+            
+            # Process the message through the message handler
+            if len(content.strip()) > 0:
+                logger.debug("Handling message: '%s'", content)
                 
-                logger.info("Processing non-command message from %s in #%s", username, channel_name)
+                # Use streaming response instead of waiting for the full response
+                bot_message = None
+                chunks = []  # Joined only when sending or editing, not on every chunk
+                total_len = 0
+                sent_len = 0  # Length of the text Discord currently shows
+                loop = asyncio.get_running_loop()
+                last_edit = loop.time()
                 
-                # Process the message through the message handler
-                if len(content.strip()) > 0:
-                    logger.info("Handling message: '%s'", content)
-                    
-                    # Use streaming response instead of waiting for the full response
-                    typing_status = False
-                    bot_message = None
-                    collected_response = ""
-                    
+                # Keep the typing indicator alive while the response streams in
+                async with message.channel.typing():
                     # Get streaming response generator
                     async for chunk in self.message_handler.handle_ai_request_stream(
                         message=content,
@@ -189,55 +253,81 @@ class DiscordBot(commands.Bot):
                         channel_id=channel_id,
                         platform="discord"
                     ):
-                        # Start typing indicator if not already started
-                        if not typing_status:
-                            await message.channel.typing()
-                            typing_status = True
-                        
                         # Append the new chunk to our collected response
-                        collected_response += chunk
-                        
+                        chunks.append(chunk)
+                        total_len += len(chunk)
+                    
                         # If we don't have a message yet, create one
-                        if not bot_message and len(collected_response) >= 10:
+                        if not bot_message and total_len >= 10:
                             try:
-                                bot_message = await message.channel.send(collected_response)
+                                bot_message = await message.channel.send("".join(chunks))
+                                sent_len = total_len
+                                last_edit = loop.time()
                             except discord.errors.Forbidden:
                                 logger.error("Cannot send response in #%s due to permission issues", channel_name)
+                                self._forget_send_permission(message.channel)
                                 return
                             except Exception as e:
                                 logger.error("Error sending initial response: %s", e)
                                 return
-                                
-                        # If we already have a message, edit it with the updated content
-                        elif bot_message and len(collected_response) >= len(bot_message.content) + 5:
+                            
+                        # If we already have a message, edit it once enough time and text have accumulated
+                        elif (bot_message and total_len - sent_len >= EDIT_MIN_CHARS
+                              and loop.time() - last_edit >= EDIT_MIN_INTERVAL):
                             try:
-                                # Only edit if we have meaningful new content to add
-                                await bot_message.edit(content=collected_response)
+                                await bot_message.edit(content="".join(chunks))
+                                sent_len = total_len
                             except Exception as e:
                                 logger.error("Error editing response: %s", e)
-                    
-                    # If we collected a response but never sent it (too short)
-                    if collected_response and not bot_message:
-                        try:
-                            await message.channel.send(collected_response)
-                        except discord.errors.Forbidden:
-                            logger.error("Cannot send final response in #%s due to permission issues", channel_name)
-                        except Exception as e:
-                            logger.error("Error sending final response: %s", e)
-                            
-                    logger.info("Sent streaming response with final length: %d characters", len(collected_response))
-                else:
-                    logger.info("Message was empty, not processing")
+                            last_edit = loop.time()
+                
+                # Flush whatever the debounced edits have not shown yet
+                if bot_message and total_len > sent_len:
+                    try:
+                        await bot_message.edit(content="".join(chunks))
+                    except Exception as e:
+                        logger.error("Error editing final response: %s", e)
+                
+                # If we collected a response but never sent it (too short)
+                elif total_len and not bot_message:
+                    try:
+                        await message.channel.send("".join(chunks))
+                    except discord.errors.Forbidden:
+                        logger.error("Cannot send final response in #%s due to permission issues", channel_name)
+                        self._forget_send_permission(message.channel)
+                    except Exception as e:
+                        logger.error("Error sending final response: %s", e)
+                        
+                logger.info("Sent streaming response with final length: %d characters", total_len)
+            else:
+                logger.info("Message was empty, not processing")
         except discord.errors.Forbidden as e:
             logger.error("Permission error in on_message: %s", e)
+            self._forget_send_permission(message.channel)
         except Exception as e:
-            logger.error("Error in on_message: %s", e)
-            logger.error(''.join(traceback.format_exception(type(e), e, e.__traceback__)))
+            logger.exception("Error in on_message: %s", e)
             try:
                 await message.channel.send("Lo siento, he encontrado un error al procesar tu mensaje.")
             except:
                 pass
             
+    async def on_guild_channel_update(self, before, after):
+        """Forget the cached send permission of a channel whose overwrites may have changed."""
+        self._send_perm_cache.pop((after.guild.id, after.id), None)
+        
+    async def on_guild_channel_delete(self, channel):
+        """Drop the cached ID string and send permission of a deleted channel."""
+        _channel_id_strings.pop(channel.id, None)
+        self._send_perm_cache.pop((channel.guild.id, channel.id), None)
+        
+    async def on_guild_role_update(self, before, after):
+        """Forget cached send permissions for a guild whose roles changed."""
+        self._invalidate_guild_permissions(after.guild.id)
+        
+    async def on_guild_role_delete(self, role):
+        """Forget cached send permissions for a guild that lost a role."""
+        self._invalidate_guild_permissions(role.guild.id)
+        
     async def on_guild_join(self, guild):
         """Log when the bot joins a new guild."""
         logger.info(f"Joined new guild: {guild.name} (ID: {guild.id})")
@@ -2,52 +2,229 @@
 Ollama API integration for the AI bot.
 """
 import os
-import json
+import re
 import logging
-import glob
 import aiohttp
 import asyncio
+import orjson
+import random
+import time
 from collections import deque
 from typing import Dict, List, Any, Optional, Tuple
 
 from config.config import (
     OLLAMA_BASE_URL,
     OLLAMA_MODEL,
+    OLLAMA_MAX_CONCURRENCY,
     AI_PERSONAS,
     LANGUAGE_PROMPTS,
     MEMORY_SIZE,
-    CHANNEL_CONTEXT_ENABLED,
-    GLOBAL_CONTEXT_SIZE,
     LANGUAGE,
-    SUPPORTED_LANGUAGES
+    SUPPORTED_LANGUAGES,
+    KNOWLEDGE_DIR
 )
 
+from utils.knowledge_retrieval import KnowledgeRetriever
+from utils.semantic_cache import SemanticCache
+
 logger = logging.getLogger(__name__)
 
+# Connection pool for the shared Ollama session; keep-alive avoids a new TCP handshake per request
+_CONNECTOR_LIMIT = 256
+_CONNECTOR_LIMIT_PER_HOST = 64
+_KEEPALIVE_TIMEOUT = 60  # Seconds an idle connection stays open
+_DNS_CACHE_TTL = 300  # Seconds
+
+# Knowledge file extensions, in the order they take precedence (later wins for a shared name)
+_KNOWLEDGE_EXT_ORDER = {'.txt': 0, '.md': 1, '.json': 2}
+
+# Streamed text is yielded once this many characters accumulate or a chunk ends on a boundary
+_STREAM_FLUSH_CHARS = 32
+_STREAM_FLUSH_ENDINGS = (' ', '.', ',', '\n', '!', '?')
+
+# Sampling options for chat replies, shared by every request instead of rebuilt per call
+_CHAT_OPTIONS = {"temperature": 0.7, "top_p": 0.9, "num_predict": 1024}
+
+# Request bodies are encoded with orjson and sent as raw bytes
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Retry backoff with full jitter: sleep a random time up to min(max, base * 2**attempt)
+_RETRY_BASE_DELAY = 0.5  # Seconds
+_RETRY_MAX_DELAY = 8.0  # Seconds
+# 4xx responses other than these will not succeed on retry
+_RETRYABLE_CLIENT_STATUSES = frozenset((408, 429))
+
+# Circuit breaker: after this many consecutive failures, fail fast for the cooldown period
+_BREAKER_FAILURE_THRESHOLD = 5
+_BREAKER_RECOVERY_SECONDS = 30.0
+
+# Whole-request deadlines for a chat reply read at once and for a streamed reply
+_REQUEST_TIMEOUT = 45.0  # Seconds
+_STREAM_REQUEST_TIMEOUT = 60.0  # Seconds
+
+# Deadline for the first streamed chunk (connect and prompt processing) adapts to recent
+# time-to-first-chunk: p95 * factor, clamped to [min, max]. Until enough samples exist the
+# default is used, which leaves headroom for cold model loads.
+_TIMEOUT_DEFAULT = 45.0  # Seconds
+_TIMEOUT_MIN = 10.0  # Seconds
+_TIMEOUT_MAX = 60.0  # Seconds
+_TIMEOUT_P95_FACTOR = 1.5
+_LATENCY_SAMPLES = 512
+_LATENCY_MIN_SAMPLES = 20
+
+# Seconds allowed for the /api/tags liveness probe
+_HEALTH_CHECK_TIMEOUT = 3.0
+
+# Chat lines that analyze_message can decide locally, without asking the model
+_FAST_IGNORE_RE = re.compile(r'^\s*(?:lol|lmao|(?:ja){2,}|xd+|gg|\+1|👍)\s*$', re.IGNORECASE)
+_FAST_RESPOND_RE = re.compile(r'\?\s*$|^\s*(?:hola|hello|hey|hi|bot|@\w+)\b', re.IGNORECASE)
+# Short lines with none of these hints are ignored; the rest are left to the model.
+# Spanish question words only count accented, since the plain forms are everyday conjunctions.
+_FAST_HINT_RE = re.compile(
+    r'\b(?:help|ayuda|bot|what|why|how|when|who|where|qué|por qu[eé]|cómo|cuándo|quién|dónde)\b',
+    re.IGNORECASE
+)
+_FAST_HINT_MAX_LEN = 80
+
+# Reply to an empty or whitespace-only message, which never reaches the model
+_EMPTY_MESSAGE_REPLY = "¡Pregúntame algo!"
+
+class CircuitOpenError(Exception):
+    """Raised when the Ollama circuit breaker is open and requests fail fast."""
+
+class FirstChunkTimeoutError(asyncio.TimeoutError):
+    """Raised when Ollama sends no content within the adaptive first-chunk deadline."""
+    
+    def __init__(self, timeout: float):
+        super().__init__(f"No response chunk within {timeout:.1f} seconds")
+        self.timeout = timeout
+
+class _CircuitBreaker:
+    """CLOSED -> OPEN -> HALF_OPEN breaker shared by every client talking to one Ollama server."""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, threshold: int = _BREAKER_FAILURE_THRESHOLD, recovery_s: float = _BREAKER_RECOVERY_SECONDS):
+        self.state = self.CLOSED
+        self.failure_count = 0
+        self.opened_at = 0.0
+        self.threshold = threshold
+        self.recovery_s = recovery_s
+        
+    def before(self):
+        """Raise CircuitOpenError unless a request may be sent now."""
+        if self.state == self.CLOSED:
+            return
+        now = time.monotonic()
+        if now - self.opened_at < self.recovery_s:
+            raise CircuitOpenError(f"Ollama circuit is {self.state}")
+        # Cooldown elapsed: let one probe through per recovery window
+        self.state = self.HALF_OPEN
+        self.opened_at = now
+        
+    def record_success(self):
+        """Close the circuit after a successful response."""
+        if self.state != self.CLOSED:
+            logger.info("Ollama circuit breaker closed")
+        self.state = self.CLOSED
+        self.failure_count = 0
+        
+    def record_failure(self):
+        """Count a failure, opening the circuit at the threshold or when a probe fails."""
+        self.failure_count += 1
+        if self.state == self.HALF_OPEN or self.failure_count >= self.threshold:
+            if self.state != self.OPEN:
+                logger.warning("Ollama circuit breaker opened after %d consecutive failures", self.failure_count)
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+# One breaker per Ollama base URL
+_breakers: Dict[str, _CircuitBreaker] = {}
+
+def _get_breaker(api_url: str) -> _CircuitBreaker:
+    """Get the circuit breaker for an Ollama server, creating it on first use."""
+    breaker = _breakers.get(api_url)
+    if breaker is None:
+        breaker = _breakers[api_url] = _CircuitBreaker()
+    return breaker
+
+def _read_knowledge_file(file_path: str, file_type: str) -> Optional[str]:
+    """Read a knowledge file from disk, formatting JSON files as indented text (blocking)."""
+    try:
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        content = raw.decode('utf-8')
+            
+        # If it's a JSON file, parse it and return a formatted string
+        if file_type == 'json':
+            try:
+                # Convert JSON to a formatted string representation
+                content = orjson.dumps(orjson.loads(raw), option=orjson.OPT_INDENT_2).decode('utf-8')
+            except orjson.JSONDecodeError:
+                logger.error("Failed to parse JSON file: %s", file_path)
+                
+        return content
+    except Exception as e:
+        logger.error("Error loading knowledge file %s: %s", file_path, e)
+        return None
+
+def _join_knowledge_content(contents: List[Tuple[str, Optional[str]]]) -> str:
+    """Combine (knowledge_name, content) pairs into the knowledge block of the system prompt."""
+    return "\n\n".join(
+        f"--- BEGIN {knowledge_name.upper()} ---\n{content}\n--- END {knowledge_name.upper()} ---"
+        for knowledge_name, content in contents if content
+    )
+
 class OllamaClient:
     """Client for the Ollama API."""
     
-    def __init__(self):
-        """Initialize the Ollama client."""
+    def __init__(self, max_concurrency: Optional[int] = None):
+        """
+        Initialize the Ollama client.
+        
+        Args:
+            max_concurrency: Maximum requests in flight to Ollama (defaults to OLLAMA_MAX_CONCURRENCY)
+        """
         self.api_url = OLLAMA_BASE_URL
         self.model = OLLAMA_MODEL
         self.current_persona = "default"
         self.current_language = LANGUAGE if LANGUAGE in SUPPORTED_LANGUAGES else "english"
         self.active_knowledge = []
-        self.conversation_contexts = {}  # Store conversation context by user/channel
-        self.channel_contexts = {}  # Store recent messages in each channel for ambient context
-        self.global_memory = deque(maxlen=GLOBAL_CONTEXT_SIZE*10)  # Store some global interactions for cross-channel learning
+        self._session: Optional[aiohttp.ClientSession] = None  # Created on first request, inside the event loop
+        # Bulkhead: the local model serves requests roughly one at a time, so extra callers queue here
+        self._inflight = asyncio.Semaphore(max_concurrency or OLLAMA_MAX_CONCURRENCY)
+        self._breaker = _get_breaker(self.api_url)
+        # Time to first chunk of recent chat requests, used to size the first-chunk deadline
+        self._latencies: deque = deque(maxlen=_LATENCY_SAMPLES)
+        
+        # Assembled system prompts keyed by (persona, language, active knowledge, knowledge file stats);
+        # the setters also clear it, so it normally holds a single prompt
+        self._prompt_cache: Dict[tuple, str] = {}
+        # Knowledge-independent (prefix, suffix) prompt parts keyed by (persona, language)
+        self._persona_template_cache: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        # Replies reused for near-identical messages (no-op unless ENABLE_SEMANTIC_CACHE is set)
+        self._semantic_cache = SemanticCache()
+        # Per-message selection of relevant knowledge chunks (no-op unless KNOWLEDGE_TOP_K is set)
+        self._knowledge_retriever = KnowledgeRetriever()
+        # Processed knowledge file contents keyed by path, reused while the file's (mtime_ns, size) is unchanged
+        self._knowledge_content_cache: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        
+        # The knowledge directory is created by the first scan if it doesn't exist
+        self.knowledge_dir = KNOWLEDGE_DIR
         
-        # Initialize the knowledge directory if it doesn't exist
-        self.knowledge_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "knowledge")
-        os.makedirs(self.knowledge_dir, exist_ok=True)
+        # Directory mtime of the last knowledge scan; an unchanged directory is not re-scanned
+        self._knowledge_scan_mtime: Optional[int] = None
+        # Available knowledge files by name; re-scanned only by refresh_knowledge()
+        self._knowledge_index: Dict[str, Dict[str, Any]] = self._scan_knowledge_files()
         
         # Auto-activate all knowledge files at startup
         self._activate_all_knowledge_files()
         
     def _activate_all_knowledge_files(self):
         """Automatically activate all knowledge files at startup."""
-        knowledge_files = self._scan_knowledge_files()
+        knowledge_files = self._knowledge_index
         
         if not knowledge_files:
             logger.info("No knowledge files found to activate at startup.")
@@ -61,114 +238,291 @@ class OllamaClient:
             else:
                 logger.warning("Failed to activate knowledge file at startup: %s (%s)", knowledge_name, message)
 
-    async def generate_response(self, message: str, username: str = "", platform: str = "", 
-                          channel_id: str = "", conversation_history: List[Dict[str, str]] = None,
-                          memory_context: str = None) -> str:
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, creating it on first use or after it was closed."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=_CONNECTOR_LIMIT,
+                limit_per_host=_CONNECTOR_LIMIT_PER_HOST,
+                keepalive_timeout=_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=_DNS_CACHE_TTL
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+        
+    async def aclose(self):
+        """Close the shared HTTP session and its pooled connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        
+    async def __aenter__(self):
+        return self
+        
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def _build_chat_messages(self, message: str, username: str, platform: str,
+                             conversation_history: Optional[List[Dict[str, str]]],
+                             memory_context: Optional[str]) -> List[Dict[str, str]]:
         """
-        Generate a response from the Ollama API.
+        Build the /api/chat message list with a byte-stable prefix.
+        
+        The system prompt only changes with persona, language or knowledge, and past turns
+        only grow at the end, so Ollama can reuse its prompt KV cache across messages. Per-message
+        context (user, platform, vector memory) goes into the final user turn.
         
         Args:
             message: The message to respond to
             username: The username of the sender
             platform: The platform (twitch, discord)
-            channel_id: The channel ID where the message was sent
             conversation_history: List of previous messages in the conversation
             memory_context: Context retrieved from vector memory database
             
         Returns:
-            The generated response
+            The messages for the chat request
         """
-        # Ensure knowledge files are activated
-        if not self.active_knowledge:
-            # Auto-activate knowledge files if none are active
-            knowledge_files = self._scan_knowledge_files()
-            for knowledge_name in knowledge_files:
-                success, _ = self.activate_knowledge(knowledge_name)
-                if success:
-                    logger.info("Auto-activated knowledge file: %s", knowledge_name)
-        
-        system_prompt = self.get_current_persona_prompt()
-        
-        # Add platform-specific context to the system prompt
-        platform_context = f"The user {username} is chatting on {platform}."
-        system_prompt = f"{system_prompt}\n\n{platform_context}"
+        messages = [{"role": "system", "content": await self._get_system_prompt()}]
         
-        # Add vector memory context if available
+        # History entries are already stored as chat messages ("user"/"assistant" roles);
+        # only the last MEMORY_SIZE turns are sent, whatever the caller passes in
+        if conversation_history:
+            if len(conversation_history) > MEMORY_SIZE:
+                conversation_history = list(conversation_history)[-MEMORY_SIZE:]
+            messages.extend(conversation_history)
+            
+        # Volatile context comes last so it never shifts the cached prefix
+        context_parts = [f"The user {username} is chatting on {platform}."]
         if memory_context:
-            memory_prompt = (
-                "\n\nA continuación hay información relevante de la base de datos vectorial "
+            context_parts.append(
+                "A continuación hay información relevante de la base de datos vectorial "
                 "que puede ser útil para responder a la consulta del usuario. Esta información "
                 "proviene tanto de conversaciones pasadas como de la base de conocimientos.\n\n"
                 f"{memory_context}"
             )
-            system_prompt = f"{system_prompt}\n\n{memory_prompt}"
             logger.info("Added vector memory context to prompt")
+        if self._knowledge_retriever.enabled and self.active_knowledge:
+            knowledge_chunks = await self._get_relevant_knowledge(message)
+            if knowledge_chunks:
+                context_parts.append(knowledge_chunks)
+        context_parts.append(message)
+        messages.append({"role": "user", "content": "\n\n".join(context_parts)})
+        return messages
+
+    async def _get_relevant_knowledge(self, message: str) -> str:
+        """Format the active knowledge chunks most relevant to a message for the final user turn."""
+        active_knowledge = tuple(self.active_knowledge)
+        contents = await self._load_knowledge_contents(active_knowledge, self._knowledge_signatures())
+        documents = {knowledge_name: contents[knowledge_name]
+                     for knowledge_name in active_knowledge if contents.get(knowledge_name)}
+        if not documents:
+            return ""
+            
+        chunks = await self._knowledge_retriever.search(message, documents)
+        if not chunks:
+            return ""
+        return "Información relevante de la base de conocimientos para este mensaje:\n\n" + "\n\n".join(
+            f"--- {knowledge_name.upper()} ---\n{chunk}" for knowledge_name, chunk in chunks
+        )
+        
+    def _first_chunk_timeout(self) -> float:
+        """Seconds allowed until the first streamed chunk: 1.5x the recent p95, clamped to sane bounds."""
+        if len(self._latencies) < _LATENCY_MIN_SAMPLES:
+            return _TIMEOUT_DEFAULT
+        samples = sorted(self._latencies)
+        p95 = samples[int(0.95 * (len(samples) - 1))]
+        return min(_TIMEOUT_MAX, max(_TIMEOUT_MIN, p95 * _TIMEOUT_P95_FACTOR))
         
-        # Call the API
-        payload = {
+    def _ensure_knowledge_active(self):
+        """Auto-activate every available knowledge file if none are active."""
+        if not self.active_knowledge:
+            for knowledge_name in list(self._knowledge_index):
+                success, _ = self.activate_knowledge(knowledge_name)
+                if success:
+                    logger.info("Auto-activated knowledge file: %s", knowledge_name)
+        
+    async def _build_payload(self, message: str, username: str, platform: str,
+                             conversation_history: Optional[List[Dict[str, str]]],
+                             memory_context: Optional[str]) -> bytes:
+        """Build the encoded /api/chat request body shared by both generate methods."""
+        return orjson.dumps({
             "model": self.model,
-            "prompt": message,
-            "system": system_prompt,
-            "stream": False,
-            "options": {
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "num_predict": 1024
-            }
-        }
-        
-        # Add conversation history if provided
-        if conversation_history and len(conversation_history) > 0:
-            formatted_history = []
-            for entry in conversation_history:
-                role = "user" if entry["role"] == "User" else "assistant"
-                formatted_history.append({"role": role, "content": entry["content"]})
-                
-            # Add the current message
-            formatted_history.append({"role": "user", "content": message})
-            payload["messages"] = formatted_history
+            "messages": await self._build_chat_messages(message, username, platform, conversation_history, memory_context),
+            "stream": True,
+            "options": _CHAT_OPTIONS
+        })
         
-        # Define increased timeout and max retries
-        timeout = aiohttp.ClientTimeout(total=45)  # Increased to 45 seconds
-        max_retries = 2
-        retry_delay = 1  # Seconds to wait between retries
+    async def _lookup_cached_reply(self, message: str):
+        """
+        Look up a cached reply for a message in the semantic cache.
         
-        for attempt in range(max_retries + 1):
-            try:
-                # Use aiohttp for async HTTP requests
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(
+        Returns:
+            A tuple of (cache_scope, embedding, cached_reply); the embedding is None
+            when the cache is disabled and the reply is None on a miss
+        """
+        if not self._semantic_cache.enabled:
+            return None, None, None
+        cache_scope = self._prompt_cache_key()
+        vector = await self._semantic_cache.embed(message)
+        if vector is None:
+            return cache_scope, None, None
+        return cache_scope, vector, self._semantic_cache.lookup(cache_scope, vector)
+        
+    async def _chat_stream(self, body: bytes, timeout: aiohttp.ClientTimeout, first_chunk_timeout: float):
+        """
+        Post a chat request and yield the content pieces as Ollama streams them.
+        
+        Args:
+            body: Encoded request body from _build_payload
+            timeout: Deadline for the whole request
+            first_chunk_timeout: Seconds allowed until the first content piece arrives
+            
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            aiohttp.ClientResponseError: If Ollama answers with a non-200 status
+            FirstChunkTimeoutError: If no content piece arrives within first_chunk_timeout
+            asyncio.TimeoutError: If the whole request exceeds its deadline
+            aiohttp.ClientError: On connection errors
+        """
+        self._breaker.before()
+        session = await self._get_session()
+        deadline = None
+        first_chunk = True
+        try:
+            async with self._inflight:
+                started = time.perf_counter()
+                deadline = started + first_chunk_timeout
+                response = await asyncio.wait_for(
+                    session.post(
                         f"{self.api_url}/api/chat", 
-                        json=payload,
+                        data=body,
+                        headers=_JSON_HEADERS,
                         timeout=timeout
-                    ) as response:
-                        if response.status != 200:
-                            error_text = await response.text()
-                            logger.error("Ollama API error (attempt %d/%d): %s - %s", 
-                                         attempt + 1, max_retries + 1, response.status, error_text)
+                    ),
+                    first_chunk_timeout
+                )
+                async with response:
+                    if response.status != 200:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history,
+                            status=response.status, message=await response.text()
+                        )
+                    self._breaker.record_success()
+                    
+                    # Only the wait for the first piece is bounded by the adaptive deadline (and sampled),
+                    # never the generation that follows or the time the consumer spends between pieces
+                    first_chunk = True
+                    while True:
+                        if first_chunk:
+                            line = await asyncio.wait_for(response.content.readline(),
+                                                          max(0.0, deadline - time.perf_counter()))
+                        else:
+                            line = await response.content.readline()
+                        if not line:
+                            break
+                        if not line.strip():
+                            continue
+                            
+                        try:
+                            # Parse JSON response chunk straight from bytes
+                            data = orjson.loads(line)
+                        except orjson.JSONDecodeError:
+                            logger.warning("Failed to parse streaming response chunk: %r", line)
+                            continue
                             
-                            # If this was the last attempt, return error message
-                            if attempt == max_retries:
-                                return "Lo siento, estoy teniendo problemas para conectarme a mi cerebro en este momento."
-                        
-                        data = await response.json()
-                        
-                        # Extract the response text
                         if "message" in data and "content" in data["message"]:
-                            result = data["message"]["content"]
-                            return result.strip()
-                        
-                        # If we got here without a proper response, try again
-                        logger.warning("No valid response in Ollama API result (attempt %d/%d)", 
-                                       attempt + 1, max_retries + 1)
-                        
-                        # If this was our last attempt, return a fallback message
-                        if attempt == max_retries:
-                            return "No estoy seguro de cómo responder a eso."
+                            chunk = data["message"]["content"]
+                            if chunk:
+                                if first_chunk:
+                                    first_chunk = False
+                                    self._latencies.append(time.perf_counter() - started)
+                                yield chunk
+                                
+                        # Check if we're done
+                        if data.get("done"):
+                            break
+                            
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            self._breaker.record_failure()
+            # Report which deadline fired: the adaptive first-chunk one or the whole-request one
+            if (isinstance(e, asyncio.TimeoutError) and first_chunk and deadline is not None
+                    and time.perf_counter() >= deadline):
+                raise FirstChunkTimeoutError(first_chunk_timeout) from e
+            raise
+        
+    async def generate_response(self, message: str, username: str = "", platform: str = "", 
+                          channel_id: str = "", conversation_history: List[Dict[str, str]] = None,
+                          memory_context: str = None) -> str:
+        """
+        Generate a response from the Ollama API.
+        
+        Args:
+            message: The message to respond to
+            username: The username of the sender
+            platform: The platform (twitch, discord)
+            channel_id: The channel ID where the message was sent
+            conversation_history: List of previous messages in the conversation
+            memory_context: Context retrieved from vector memory database
+            
+        Returns:
+            The generated response
+        """
+        # Nothing to answer: skip prompt building and the HTTP round trip
+        if not message or not message.strip():
+            return _EMPTY_MESSAGE_REPLY
+            
+        self._ensure_knowledge_active()
+        
+        cache_scope, cache_vector, cached_reply = await self._lookup_cached_reply(message)
+        if cached_reply is not None:
+            logger.debug("Semantic cache hit for message: %s", message[:30])
+            return cached_reply
+        
+        # The body is encoded once and reused by every retry
+        body = await self._build_payload(message, username, platform, conversation_history, memory_context)
+        
+        # Define timeout and max retries
+        timeout = aiohttp.ClientTimeout(total=_REQUEST_TIMEOUT)
+        first_chunk_timeout = self._first_chunk_timeout()
+        max_retries = 2
+        
+        for attempt in range(max_retries + 1):
+            try:
+                chunks = [chunk async for chunk in self._chat_stream(body, timeout, first_chunk_timeout)]
+                if chunks:
+                    result = "".join(chunks).strip()
+                    if cache_vector is not None:
+                        self._semantic_cache.store(cache_scope, cache_vector, result)
+                    return result
+                
+                # If we got here without a proper response, try again
+                logger.warning("No valid response in Ollama API result (attempt %d/%d)", 
+                               attempt + 1, max_retries + 1)
                 
-            except asyncio.TimeoutError:
-                logger.error("Timeout calling Ollama API (attempt %d/%d, timeout=%d seconds)",
-                             attempt + 1, max_retries + 1, timeout.total)
+                # If this was our last attempt, return a fallback message
+                if attempt == max_retries:
+                    return "No estoy seguro de cómo responder a eso."
+                
+            except CircuitOpenError:
+                logger.warning("Ollama circuit breaker is open, skipping request")
+                return "Lo siento, estoy teniendo problemas para conectarme a mi cerebro en este momento."
+            
+            except aiohttp.ClientResponseError as e:
+                logger.error("Ollama API error (attempt %d/%d): %s - %s", 
+                             attempt + 1, max_retries + 1, e.status, e.message)
+                
+                # Return the error message on the last attempt or when retrying cannot help
+                permanent = 400 <= e.status < 500 and e.status not in _RETRYABLE_CLIENT_STATUSES
+                if attempt == max_retries or permanent:
+                    return "Lo siento, estoy teniendo problemas para conectarme a mi cerebro en este momento."
+            
+            except asyncio.TimeoutError as e:
+                if isinstance(e, FirstChunkTimeoutError):
+                    logger.error("Timeout calling Ollama API (attempt %d/%d, first chunk timeout=%d seconds)",
+                                 attempt + 1, max_retries + 1, e.timeout)
+                else:
+                    logger.error("Timeout calling Ollama API (attempt %d/%d, total timeout=%d seconds)",
+                                 attempt + 1, max_retries + 1, timeout.total)
                 
                 # If this was the last attempt, return specific timeout message
                 if attempt == max_retries:
@@ -184,11 +538,9 @@ class OllamaClient:
                 if attempt == max_retries:
                     return "Lo siento, estoy teniendo problemas técnicos. Intentémoslo de nuevo más tarde."
             
-            # Wait before retrying
+            # Wait before retrying, with full jitter so concurrent callers do not retry in lockstep
             if attempt < max_retries:
-                await asyncio.sleep(retry_delay)
-                # Increase delay for next attempt
-                retry_delay *= 2  # Exponential backoff
+                await asyncio.sleep(random.uniform(0, min(_RETRY_MAX_DELAY, _RETRY_BASE_DELAY * (2 ** attempt))))
 
     async def generate_response_stream(self, message: str, username: str = "", platform: str = "", 
                                 channel_id: str = "", conversation_history: List[Dict[str, str]] = None,
@@ -207,132 +559,78 @@ class OllamaClient:
         Returns:
             An async generator that yields response chunks as they are generated
         """
-        # Ensure knowledge files are activated
-        if not self.active_knowledge:
-            # Auto-activate knowledge files if none are active
-            knowledge_files = self._scan_knowledge_files()
-            for knowledge_name in knowledge_files:
-                success, _ = self.activate_knowledge(knowledge_name)
-                if success:
-                    logger.info("Auto-activated knowledge file: %s", knowledge_name)
-        
-        system_prompt = self.get_current_persona_prompt()
-        
-        # Add platform-specific context to the system prompt
-        platform_context = f"The user {username} is chatting on {platform}."
-        system_prompt = f"{system_prompt}\n\n{platform_context}"
+        # Nothing to answer: skip prompt building and the HTTP round trip
+        if not message or not message.strip():
+            yield _EMPTY_MESSAGE_REPLY
+            self._last_stream_response = _EMPTY_MESSAGE_REPLY
+            return
+            
+        self._ensure_knowledge_active()
         
-        # Add vector memory context if available
-        if memory_context:
-            memory_prompt = (
-                "\n\nA continuación hay información relevante de la base de datos vectorial "
-                "que puede ser útil para responder a la consulta del usuario. Esta información "
-                "proviene tanto de conversaciones pasadas como de la base de conocimientos.\n\n"
-                f"{memory_context}"
-            )
-            system_prompt = f"{system_prompt}\n\n{memory_prompt}"
-            logger.info("Added vector memory context to prompt")
+        cache_scope, cache_vector, cached_reply = await self._lookup_cached_reply(message)
+        if cached_reply is not None:
+            logger.debug("Semantic cache hit for message: %s", message[:30])
+            yield cached_reply
+            self._last_stream_response = cached_reply
+            return
         
-        # Call the API
-        payload = {
-            "model": self.model,
-            "prompt": message,
-            "system": system_prompt,
-            "stream": True,  # Enable streaming
-            "options": {
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "num_predict": 1024
-            }
-        }
-        
-        # Add conversation history if provided
-        if conversation_history and len(conversation_history) > 0:
-            formatted_history = []
-            for entry in conversation_history:
-                role = "user" if entry["role"] == "User" else "assistant"
-                formatted_history.append({"role": role, "content": entry["content"]})
-                
-            # Add the current message
-            formatted_history.append({"role": "user", "content": message})
-            payload["messages"] = formatted_history
+        body = await self._build_payload(message, username, platform, conversation_history, memory_context)
         
-        # Define timeout
-        timeout = aiohttp.ClientTimeout(total=60)  # Longer timeout for streaming
+        # Longer timeout for streaming, since the whole reply is read under it
+        timeout = aiohttp.ClientTimeout(total=_STREAM_REQUEST_TIMEOUT)
         
-        # For error tracking
-        error_occurred = False
-        full_response = ""
+        # Pieces are collected in lists and joined once, never concatenated
+        full_response: List[str] = []
+        buffer: List[str] = []
+        buffered_chars = 0
         
         try:
-            # Use aiohttp for async HTTP requests with streaming
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.api_url}/api/chat", 
-                    json=payload,
-                    timeout=timeout
-                ) as response:
-                    if response.status != 200:
-                        logger.error("Ollama API error: %s - %s", response.status, await response.text())
-                        yield "Lo siento, estoy teniendo problemas para conectarme a mi cerebro en este momento."
-                        error_occurred = True
-                        
-                    if not error_occurred:
-                        # Process the streaming response
-                        buffer = ""
-                        
-                        async for line in response.content:
-                            if not line:
-                                continue
-                                
-                            line_text = line.decode('utf-8').strip()
-                            if not line_text:
-                                continue
-                                
-                            try:
-                                # Parse JSON response chunk
-                                data = json.loads(line_text)
-                                
-                                if "message" in data and "content" in data["message"]:
-                                    # Get the new content chunk
-                                    chunk = data["message"]["content"]
-                                    if chunk:
-                                        # Append to the full response
-                                        full_response += chunk
-                                        buffer += chunk
-                                        
-                                        # Yield the buffer when we have a decent chunk or at end
-                                        if len(buffer) >= 4 or "done" in data:
-                                            yield buffer
-                                            buffer = ""
-                                            
-                                # Check if we're done
-                                if "done" in data and data["done"]:
-                                    if buffer:  # Yield any remaining buffer
-                                        yield buffer
-                                    break
-                                    
-                            except json.JSONDecodeError:
-                                logger.warning("Failed to parse streaming response chunk: %s", line_text)
-                                continue
-                                
-                        # If we didn't get any response, yield a fallback message
-                        if not full_response:
-                            yield "No estoy seguro de cómo responder a eso."
+            async for chunk in self._chat_stream(body, timeout, self._first_chunk_timeout()):
+                full_response.append(chunk)
+                buffer.append(chunk)
+                buffered_chars += len(chunk)
+                
+                # Yield at word/sentence boundaries or once the buffer is large enough
+                if buffered_chars >= _STREAM_FLUSH_CHARS or chunk.endswith(_STREAM_FLUSH_ENDINGS):
+                    yield "".join(buffer)
+                    buffer.clear()
+                    buffered_chars = 0
                     
-        except asyncio.TimeoutError:
-            logger.error("Timeout in streaming response from Ollama API")
+            if buffer:  # Yield any remaining buffer
+                yield "".join(buffer)
+                
+            # If we didn't get any response, yield a fallback message
+            if not full_response:
+                yield "No estoy seguro de cómo responder a eso."
+            elif cache_vector is not None:
+                self._semantic_cache.store(cache_scope, cache_vector, "".join(full_response).strip())
+                
+        except CircuitOpenError:
+            logger.warning("Ollama circuit breaker is open, skipping streaming request")
+            yield "Lo siento, estoy teniendo problemas para conectarme a mi cerebro en este momento."
+            full_response = ["Lo siento, estoy teniendo problemas para conectarme a mi cerebro en este momento."]
+            
+        except aiohttp.ClientResponseError as e:
+            logger.error("Ollama API error: %s - %s", e.status, e.message)
+            yield "Lo siento, estoy teniendo problemas para conectarme a mi cerebro en este momento."
+            full_response = []
+            
+        except asyncio.TimeoutError as e:
+            if isinstance(e, FirstChunkTimeoutError):
+                logger.error("Timeout in streaming response from Ollama API (first chunk timeout=%d seconds)", e.timeout)
+            else:
+                logger.error("Timeout in streaming response from Ollama API (total timeout=%d seconds)", timeout.total)
             yield "Lo siento, me está tomando demasiado tiempo procesar tu mensaje. ¿Podrías intentar con una pregunta más simple?"
-            full_response = "Lo siento, me está tomando demasiado tiempo procesar tu mensaje."
+            full_response = ["Lo siento, me está tomando demasiado tiempo procesar tu mensaje."]
             
         except aiohttp.ClientError as e:
             logger.error("Error in streaming response from Ollama API: %s", e)
             yield "Lo siento, estoy teniendo problemas técnicos. Intentémoslo de nuevo más tarde."
-            full_response = "Lo siento, estoy teniendo problemas técnicos."
+            full_response = ["Lo siento, estoy teniendo problemas técnicos."]
             
         # Store the completed response as an attribute that can be accessed after the generator completes
         # This is a common pattern to return values from async generators
-        self._last_stream_response = full_response.strip()
+        self._last_stream_response = "".join(full_response).strip()
 
     async def generate_persona_response(self, message: str, persona: str, username: str = "", 
                                 platform: str = "", channel_id: str = "", 
@@ -386,8 +684,17 @@ class OllamaClient:
             channel_id: The channel ID where the message was sent
             
         Returns:
-            A tuple of (should_respond, response_text)
+            A tuple of (should_respond, response_text); response_text is None when
+            the decision was made locally and the caller should generate the reply
         """
+        # Obvious cases are decided locally; only ambiguous lines go to the model
+        if not message or not message.strip() or _FAST_IGNORE_RE.match(message):
+            return False, None
+        if _FAST_RESPOND_RE.search(message):
+            return True, None
+        if len(message) < _FAST_HINT_MAX_LEN and not _FAST_HINT_RE.search(message):
+            return False, None
+        
         # Construct a query to the AI
         system_prompt = (
             "Eres un asistente útil que decide si un mensaje en un chat requiere una respuesta. "
@@ -406,32 +713,40 @@ class OllamaClient:
                 }
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.api_url}/api/generate", 
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=10)  # 10 second timeout
-                ) as response:
-                    if response.status != 200:
-                        logger.error("Error de API Ollama: %s - %s", response.status, await response.text())
-                        return False, None
-                    
-                    data = await response.json()
+            self._breaker.before()
+            session = await self._get_session()
+            async with self._inflight, session.post(
+                f"{self.api_url}/api/generate", 
+                data=orjson.dumps(payload),
+                headers=_JSON_HEADERS,
+                timeout=aiohttp.ClientTimeout(total=10)  # 10 second timeout
+            ) as response:
+                if response.status != 200:
+                    self._breaker.record_failure()
+                    logger.error("Error de API Ollama: %s - %s", response.status, await response.text())
+                    return False, None
+                self._breaker.record_success()
+                
+                data = orjson.loads(await response.read())
+                
+                # Extract the decision
+                if "response" in data:
+                    result = data["response"].strip()
                     
-                    # Extract the decision
-                    if "response" in data:
-                        result = data["response"].strip()
+                    if result.startswith("RESPOND:"):
+                        # Extract the suggested response
+                        ai_response = result[8:].strip()  # Remove "RESPOND: " prefix
+                        return True, ai_response
+                    else:
+                        return False, None
                         
-                        if result.startswith("RESPOND:"):
-                            # Extract the suggested response
-                            ai_response = result[8:].strip()  # Remove "RESPOND: " prefix
-                            return True, ai_response
-                        else:
-                            return False, None
-                            
-                    return False, None
+                return False, None
             
-        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        except CircuitOpenError:
+            return False, None
+            
+        except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError) as e:
+            self._breaker.record_failure()
             logger.error("Error al llamar a la API de Ollama para análisis: %s", e)
             return False, None
             
@@ -447,6 +762,7 @@ class OllamaClient:
         """
         if persona in AI_PERSONAS:
             self.current_persona = persona
+            self._prompt_cache.clear()
             return True, f"Personalidad cambiada a {persona}"
         else:
             available = ", ".join(AI_PERSONAS.keys())
@@ -464,56 +780,134 @@ class OllamaClient:
         """
         if language in SUPPORTED_LANGUAGES:
             self.current_language = language
+            self._prompt_cache.clear()
             return True, f"Idioma cambiado a {language}"
         else:
             available = ", ".join(SUPPORTED_LANGUAGES)
             return False, f"Idioma '{language}' desconocido. Idiomas disponibles: {available}"
         
-    def get_current_persona_prompt(self):
-        """Get the system prompt for the current persona with language instructions and knowledge files."""
-        base_prompt = AI_PERSONAS.get(self.current_persona, AI_PERSONAS["default"])
-        
-        # Add language-specific instructions - make this a top priority
-        language_prompt = LANGUAGE_PROMPTS.get(self.current_language, "")
-        
-        # Add knowledge files if any are active
-        knowledge_content = self._get_active_knowledge_content()
-        knowledge_prompt = ""
-        if knowledge_content:
-            knowledge_prompt = (
-                "\n\nTienes acceso a la siguiente base de conocimientos. Usa esta información al responder preguntas:\n\n"
-                f"{knowledge_content}"
-                "\n\nCuando respondas preguntas que se relacionen directamente con la base de conocimientos, asegúrate de usar SOLO la información proporcionada."
-            )
+    def _prompt_cache_key(self) -> tuple:
+        """Key identifying the inputs of the current system prompt."""
+        return (self.current_persona, self.current_language, tuple(self.active_knowledge),
+                self._knowledge_signatures(), self._knowledge_retriever.enabled)
         
-        # Add additional context awareness guidance (language instructions first and last for emphasis)
-        context_prompt = (
-            f"{language_prompt}\n\n" 
-            f"{base_prompt}\n\n"  
-            "Presta atención al historial de conversación y al contexto proporcionado. "
-            "Tus respuestas deben ser concisas (1-3 oraciones) y adaptadas a la plataforma. "
-            "Evita cualquier tema controvertido y contenido potencialmente dañino."
-            f"{knowledge_prompt}\n\n"
-            f"INSTRUCCIÓN FINAL IMPORTANTE: {language_prompt}"  # Emphasized as final instruction for higher adherence
-        )
+    def _knowledge_signatures(self) -> tuple:
+        """(path, mtime_ns, size) of each active knowledge file, so editing a file in place changes the prompt key."""
+        signatures = []
+        for knowledge_name in self.active_knowledge:
+            file_info = self._knowledge_index.get(knowledge_name)
+            if file_info is None:
+                signatures.append(None)
+                continue
+            try:
+                st = os.stat(file_info['path'])
+            except OSError:
+                signatures.append(None)
+                continue
+            signatures.append((file_info['path'], st.st_mtime_ns, st.st_size))
+        return tuple(signatures)
+        
+    async def _get_system_prompt(self) -> str:
+        """
+        Get the current system prompt without blocking the event loop.
+        
+        The persona, language and active knowledge are captured here on the event loop,
+        since generate_persona_response swaps the persona across awaits. On a cache miss
+        only changed knowledge files are read in a worker thread.
+        """
+        cache_key = self._prompt_cache_key()
+        cached_prompt = self._prompt_cache.get(cache_key)
+        if cached_prompt is not None:
+            return cached_prompt
+            
+        persona, language, active_knowledge, signatures, retrieval_enabled = cache_key
+        knowledge_content = ""
+        if not retrieval_enabled:
+            contents = await self._load_knowledge_contents(active_knowledge, signatures)
+            knowledge_content = _join_knowledge_content(
+                [(knowledge_name, contents.get(knowledge_name)) for knowledge_name in active_knowledge]
+            )
+            
+        context_prompt = self._assemble_prompt(persona, language, knowledge_content)
+        self._prompt_cache[cache_key] = context_prompt
         return context_prompt
         
-    def _get_active_knowledge_content(self):
-        """Get the content of all active knowledge files, combined into a single string."""
-        if not self.active_knowledge:
-            return ""
+    async def _load_knowledge_contents(self, active_knowledge: Tuple[str, ...], signatures: tuple) -> Dict[str, str]:
+        """
+        Get the contents of knowledge files without blocking the event loop.
+        
+        Files whose (mtime_ns, size) still match the content cache are served from it;
+        the rest are read in a worker thread, and the cache is updated back on the loop.
+        
+        Args:
+            active_knowledge: Names of the knowledge files
+            signatures: (path, mtime_ns, size) of each file from _knowledge_signatures(), None if missing
             
-        content_parts = []
-        for knowledge_name in self.active_knowledge:
-            content = self.load_knowledge_content(knowledge_name)
-            if content:
-                content_parts.append(f"--- BEGIN {knowledge_name.upper()} ---\n{content}\n--- END {knowledge_name.upper()} ---")
+        Returns:
+            Content by knowledge name, for the files that could be read
+        """
+        contents = {}
+        to_read = []
+        for knowledge_name, signature in zip(active_knowledge, signatures):
+            if signature is None:
+                continue
+            file_path, stat_signature = signature[0], signature[1:]
+            cached = self._knowledge_content_cache.get(file_path)
+            if cached is not None and cached[0] == stat_signature:
+                contents[knowledge_name] = cached[1]
+            else:
+                to_read.append((knowledge_name, file_path, self._knowledge_index[knowledge_name]['type'], stat_signature))
+                
+        if to_read:
+            read = await asyncio.to_thread(
+                lambda: [_read_knowledge_file(file_path, file_type) for _, file_path, file_type, _ in to_read]
+            )
+            for (knowledge_name, file_path, _, stat_signature), content in zip(to_read, read):
+                if content is not None:
+                    self._knowledge_content_cache[file_path] = (stat_signature, content)
+                    contents[knowledge_name] = content
+        return contents
         
-        if not content_parts:
-            return ""
+    def _assemble_prompt(self, persona: str, language: str, knowledge_content: str) -> str:
+        """Splice the knowledge block, if any, between the persona template's prefix and suffix."""
+        prefix, suffix = self._get_persona_template(persona, language)
+        if not knowledge_content:
+            return prefix + suffix
+        return "".join((
+            prefix,
+            "\n\nTienes acceso a la siguiente base de conocimientos. Usa esta información al responder preguntas:\n\n",
+            knowledge_content,
+            "\n\nCuando respondas preguntas que se relacionen directamente con la base de conocimientos, asegúrate de usar SOLO la información proporcionada.",
+            suffix,
+        ))
+        
+    def _get_persona_template(self, persona: str, language: str) -> Tuple[str, str]:
+        """
+        Get the knowledge-independent (prefix, suffix) of the system prompt.
+        
+        Both parts only depend on the persona and language, so they are rendered
+        once per pair and the knowledge block is spliced in between them.
+        """
+        template_key = (persona, language)
+        template = self._persona_template_cache.get(template_key)
+        if template is None:
+            base_prompt = AI_PERSONAS.get(persona, AI_PERSONAS["default"])
             
-        return "\n\n".join(content_parts)
-
+            # Add language-specific instructions - make this a top priority
+            language_prompt = LANGUAGE_PROMPTS.get(language, "")
+            
+            # Add additional context awareness guidance (language instructions first and last for emphasis)
+            prefix = (
+                f"{language_prompt}\n\n"
+                f"{base_prompt}\n\n"
+                "Presta atención al historial de conversación y al contexto proporcionado. "
+                "Tus respuestas deben ser concisas (1-3 oraciones) y adaptadas a la plataforma. "
+                "Evita cualquier tema controvertido y contenido potencialmente dañino."
+            )
+            suffix = f"\n\nINSTRUCCIÓN FINAL IMPORTANTE: {language_prompt}"  # Emphasized as final instruction for higher adherence
+            template = self._persona_template_cache[template_key] = (prefix, suffix)
+        return template
+        
     def _scan_knowledge_files(self):
         """Scan the knowledge directory for available knowledge files."""
         knowledge_files = {}
@@ -521,67 +915,78 @@ class OllamaClient:
         # Ensure the knowledge directory exists
         if not os.path.exists(self.knowledge_dir):
             os.makedirs(self.knowledge_dir, exist_ok=True)
-            logger.info(f"Created knowledge directory at {self.knowledge_dir}")
+            logger.info("Created knowledge directory at %s", self.knowledge_dir)
             return knowledge_files
             
-        # Look for text, markdown, and JSON files
-        file_patterns = ['*.txt', '*.md', '*.json']
-        for pattern in file_patterns:
-            for file_path in glob.glob(os.path.join(self.knowledge_dir, pattern)):
-                file_name = os.path.basename(file_path)
-                knowledge_name = os.path.splitext(file_name)[0]
-                knowledge_files[knowledge_name] = {
-                    'name': knowledge_name,
-                    'path': file_path,
-                    'type': os.path.splitext(file_name)[1][1:],  # Get extension without dot
-                    'size': os.path.getsize(file_path)
-                }
+        # Adding, removing or renaming a file changes the directory mtime
+        dir_mtime = os.stat(self.knowledge_dir).st_mtime_ns
+        if dir_mtime == self._knowledge_scan_mtime:
+            return self._knowledge_index
+            
+        # Look for text, markdown, and JSON files in a single directory pass
+        found = []
+        with os.scandir(self.knowledge_dir) as entries:
+            for entry in entries:
+                knowledge_name, ext = os.path.splitext(entry.name)
+                if ext in _KNOWLEDGE_EXT_ORDER and entry.is_file():
+                    found.append((_KNOWLEDGE_EXT_ORDER[ext], entry.name, knowledge_name, ext, entry))
+                    
+        # Same order as scanning .txt, then .md, then .json: a later type wins a shared name
+        for _, file_name, knowledge_name, ext, entry in sorted(found, key=lambda item: item[:2]):
+            knowledge_files[knowledge_name] = {
+                'name': knowledge_name,
+                'path': entry.path,
+                'type': ext[1:],  # Get extension without dot
+                'size': entry.stat().st_size
+            }
                 
-        logger.info(f"Found {len(knowledge_files)} knowledge files in {self.knowledge_dir}")
+        self._knowledge_scan_mtime = dir_mtime
+        logger.info("Found %d knowledge files in %s", len(knowledge_files), self.knowledge_dir)
         return knowledge_files
         
+    def refresh_knowledge(self):
+        """Re-scan the knowledge directory so added or removed files are picked up."""
+        # Prompts are keyed by the paths and stats of the active files, so a changed index is not served stale
+        self._knowledge_index = self._scan_knowledge_files()
+        return self._knowledge_index
+        
     def load_knowledge_content(self, knowledge_name):
         """Load the content of a specific knowledge file."""
-        knowledge_files = self._scan_knowledge_files()
-        
-        if knowledge_name not in knowledge_files:
+        file_info = self._knowledge_index.get(knowledge_name)
+        if file_info is None:
             return None
             
-        file_info = knowledge_files[knowledge_name]
         file_path = file_info['path']
         file_type = file_info['type']
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-            # If it's a JSON file, parse it and return a formatted string
-            if file_type == 'json':
-                try:
-                    data = json.loads(content)
-                    # Convert JSON to a formatted string representation
-                    return json.dumps(data, indent=2)
-                except json.JSONDecodeError:
-                    logger.error(f"Failed to parse JSON file: {file_path}")
-                    return content
-                    
-            return content
-        except Exception as e:
-            logger.error(f"Error loading knowledge file {file_path}: {e}")
+            st = os.stat(file_path)
+        except OSError as e:
+            logger.error("Error loading knowledge file %s: %s", file_path, e)
             return None
             
+        signature = (st.st_mtime_ns, st.st_size)
+        cached = self._knowledge_content_cache.get(file_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+            
+        content = _read_knowledge_file(file_path, file_type)
+        if content is not None:
+            self._knowledge_content_cache[file_path] = (signature, content)
+        return content
+            
     def activate_knowledge(self, knowledge_name):
         """Activate a knowledge file for use in responses."""
-        knowledge_files = self._scan_knowledge_files()
-        
-        if knowledge_name not in knowledge_files:
+        # A file added since the last scan is only found after re-scanning
+        if knowledge_name not in self._knowledge_index and knowledge_name not in self.refresh_knowledge():
             return False, f"Archivo de conocimiento '{knowledge_name}' no encontrado"
             
         if knowledge_name in self.active_knowledge:
             return True, f"Archivo de conocimiento '{knowledge_name}' ya está activo"
             
         self.active_knowledge.append(knowledge_name)
-        logger.info(f"Activated knowledge file: {knowledge_name}")
+        self._prompt_cache.clear()
+        logger.info("Activated knowledge file: %s", knowledge_name)
         return True, f"Archivo de conocimiento '{knowledge_name}' activado"
         
     def deactivate_knowledge(self, knowledge_name):
@@ -590,12 +995,13 @@ class OllamaClient:
             return False, f"Archivo de conocimiento '{knowledge_name}' no está activo"
             
         self.active_knowledge.remove(knowledge_name)
-        logger.info(f"Deactivated knowledge file: {knowledge_name}")
+        self._prompt_cache.clear()
+        logger.info("Deactivated knowledge file: %s", knowledge_name)
         return True, f"Archivo de conocimiento '{knowledge_name}' desactivado"
         
     def list_knowledge_files(self):
         """List all available knowledge files."""
-        knowledge_files = self._scan_knowledge_files()
+        knowledge_files = self.refresh_knowledge()
         result = "Archivos de conocimiento disponibles:\n\n"
         
         if not knowledge_files:
@@ -616,47 +1022,44 @@ class OllamaClient:
             A tuple of (is_healthy, message)
         """
         try:
-            # Use a short timeout for the health check
-            timeout = aiohttp.ClientTimeout(total=10)
-            
-            # Create a simple query to test API responsiveness
-            payload = {
-                "model": self.model,
-                "prompt": "Hello",
-                "system": "You are a helpful assistant. Respond with 'OK' only.",
-                "stream": False,
-                "options": {
-                    "temperature": 0.0,  # Use deterministic output
-                    "num_predict": 10   # Keep response very short
-                }
-            }
+            # Listing the installed models is answered without loading the model,
+            # so the probe stays cheap and does not compete with chat requests
+            self._breaker.before()
+            session = await self._get_session()
+            async with session.get(
+                f"{self.api_url}/api/tags",
+                timeout=aiohttp.ClientTimeout(total=_HEALTH_CHECK_TIMEOUT)
+            ) as response:
+                if response.status != 200:
+                    self._breaker.record_failure()
+                    error_text = await response.text()
+                    logger.error("Health check failed: %s - %s", response.status, error_text)
+                    return False, f"API error: {response.status}"
+                self._breaker.record_success()
+                
+                data = orjson.loads(await response.read())
+                
+            # Verify the configured model is installed ("llama2" matches "llama2:latest")
+            installed = {model.get("name", "") for model in data.get("models", [])}
+            wanted = self.model if ":" in self.model else f"{self.model}:latest"
+            if self.model in installed or wanted in installed:
+                logger.info("Health check successful: Ollama API is responsive")
+                return True, "Ollama API is responsive"
+            else:
+                logger.error("Health check failed: model %s is not installed", self.model)
+                return False, f"Model {self.model} is not installed in Ollama"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.api_url}/api/chat", 
-                    json=payload,
-                    timeout=timeout
-                ) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error("Health check failed: %s - %s", response.status, error_text)
-                        return False, f"API error: {response.status}"
-                    
-                    data = await response.json()
-                    
-                    # Verify we got a valid response structure
-                    if "message" in data and "content" in data["message"]:
-                        logger.info("Health check successful: Ollama API is responsive")
-                        return True, "Ollama API is responsive"
-                    else:
-                        logger.error("Health check failed: Unexpected response format")
-                        return False, "Unexpected response format from API"
+        except CircuitOpenError:
+            logger.error("Health check failed: Ollama circuit breaker is open")
+            return False, "Ollama circuit breaker is open"
             
         except asyncio.TimeoutError:
+            self._breaker.record_failure()
             logger.error("Health check failed: Timeout connecting to Ollama API")
             return False, "Timeout connecting to Ollama API"
             
         except aiohttp.ClientError as e:
+            self._breaker.record_failure()
             logger.error("Health check failed: %s", e)
             return False, f"Connection error: {e}"
             
@@ -1,5 +1,4 @@
 import logging
-import twitchio
 from twitchio.ext import commands
 from config.config import (
     TWITCH_TOKEN, 
@@ -11,6 +10,31 @@ from utils.message_handler import MessageHandler
 
 logger = logging.getLogger(__name__)
 
+# Commands whose handler takes no arguments; like the Discord bot, they always get ""
+_NO_ARGS_COMMANDS = frozenset({"help", "ping", "personas", "languages"})
+
+# Chat commands and the MessageHandler method each one forwards its arguments to
+_COMMAND_HANDLERS = {
+    "help": "command_help",
+    "ping": "command_ping",
+    "ai": "command_ai",
+    "persona": "command_persona",
+    "personas": "command_list_personas",
+    "language": "command_language",
+    "languages": "command_list_languages",
+}
+
+def _make_command(name, handler_name):
+    """Build a Twitch command that passes the rest of the line (if it takes any) to a MessageHandler method."""
+    takes_args = name not in _NO_ARGS_COMMANDS
+    
+    async def command(ctx, *, args=""):
+        handler = getattr(ctx.bot.message_handler, handler_name)
+        response = await handler(args if takes_args else "", ctx.author.name, ctx.channel.name, "twitch")
+        if response:
+            await ctx.send(response)
+    return commands.Command(name=name, func=command)
+
 class TwitchBot(commands.Bot):
     def __init__(self):
         # Initialize the message handler
@@ -33,6 +57,9 @@ class TwitchBot(commands.Bot):
             client_id=TWITCH_CLIENT_ID
         )
         
+        for name, handler_name in _COMMAND_HANDLERS.items():
+            self.add_command(_make_command(name, handler_name))
+        
     async def event_ready(self):
         """Called once when the bot goes online."""
         logger.info(f"Twitch Bot is online! Username: {self.nick}")
@@ -65,33 +92,7 @@ class TwitchBot(commands.Bot):
         if response:
             await message.channel.send(response)
             
-    # Basic commands
-    @commands.command(name="help")
-    async def help_command(self, ctx):
-        response = await self.message_handler.command_help("", ctx.author.name, ctx.channel.name, "twitch")
-        await ctx.send(response)
-        
-    @commands.command(name="ping")
-    async def ping_command(self, ctx):
-        response = await self.message_handler.command_ping("", ctx.author.name, ctx.channel.name, "twitch")
-        await ctx.send(response)
-        
-    @commands.command(name="ai")
-    async def ai_command(self, ctx, *, message=""):
-        response = await self.message_handler.command_ai(message, ctx.author.name, ctx.channel.name, "twitch")
-        await ctx.send(response)
-        
-    # New persona-related commands
-    @commands.command(name="persona")
-    async def persona_command(self, ctx, *, persona_name=""):
-        response = await self.message_handler.command_persona(persona_name, ctx.author.name, ctx.channel.name, "twitch")
-        await ctx.send(response)
-        
-    @commands.command(name="personas")
-    async def personas_command(self, ctx):
-        response = await self.message_handler.command_list_personas("", ctx.author.name, ctx.channel.name, "twitch")
-        await ctx.send(response)
-        
+    # Registered separately: it splits the persona name from the message
     @commands.command(name="ask")
     async def ask_command(self, ctx, persona_name="", *, message=""):
         if not persona_name or not message:
@@ -101,14 +102,3 @@ class TwitchBot(commands.Bot):
         args = f"{persona_name} {message}"
         response = await self.message_handler.command_ask_as_persona(args, ctx.author.name, ctx.channel.name, "twitch")
         await ctx.send(response)
-        
-    # Language commands
-    @commands.command(name="language")
-    async def language_command(self, ctx, *, language_name=""):
-        response = await self.message_handler.command_language(language_name, ctx.author.name, ctx.channel.name, "twitch")
-        await ctx.send(response)
-        
-    @commands.command(name="languages")
-    async def languages_command(self, ctx):
-        response = await self.message_handler.command_list_languages("", ctx.author.name, ctx.channel.name, "twitch")
-        await ctx.send(response)
\ No newline at end of file
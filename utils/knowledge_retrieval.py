@@ -0,0 +1,103 @@
+"""
+Knowledge retrieval for the AI bot.
+
+Active knowledge files are split into chunks and embedded once per file version,
+so each message carries only the chunks most relevant to it instead of every file.
+"""
+import asyncio
+import logging
+from typing import Dict, List, Tuple
+
+from config.config import KNOWLEDGE_TOP_K
+from utils.semantic_cache import SEMANTIC_CACHE_AVAILABLE, load_embedding_model
+
+if SEMANTIC_CACHE_AVAILABLE:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Chunks are packed from whole lines up to about 300 tokens
+_CHUNK_CHARS = 1200
+_ENCODE_BATCH_SIZE = 32
+
+
+def _split_chunks(content: str) -> List[str]:
+    """Split knowledge text into chunks of whole lines of at most _CHUNK_CHARS characters."""
+    chunks = []
+    current: List[str] = []
+    current_len = 0
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        # Lines longer than a chunk are cut on their own
+        while len(line) > _CHUNK_CHARS:
+            chunks.append(line[:_CHUNK_CHARS])
+            line = line[_CHUNK_CHARS:]
+        if current and current_len + len(line) + 1 > _CHUNK_CHARS:
+            chunks.append("\n".join(current))
+            current, current_len = [], 0
+        current.append(line)
+        current_len += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class KnowledgeRetriever:
+    """Select the knowledge chunks most similar to a message."""
+
+    def __init__(self):
+        """Initialize the retriever; disabled unless KNOWLEDGE_TOP_K is set and embeddings are available."""
+        self.top_k = KNOWLEDGE_TOP_K
+        self.enabled = self.top_k > 0 and SEMANTIC_CACHE_AVAILABLE
+        # Chunks and their normalized embeddings by knowledge name, with the content they were built from
+        self._indexes: Dict[str, Tuple[str, List[str], "np.ndarray"]] = {}
+
+        if self.top_k > 0 and not SEMANTIC_CACHE_AVAILABLE:
+            logger.warning("Knowledge retrieval dependencies not available. Sending whole knowledge files.")
+            logger.warning("Install with: pip install numpy sentence-transformers")
+
+    def _get_index(self, knowledge_name: str, content: str) -> Tuple[str, List[str], "np.ndarray"]:
+        """Get the chunk index of a knowledge file, batch-embedding it when its content changed (blocking)."""
+        index = self._indexes.get(knowledge_name)
+        if index is None or index[0] != content:
+            chunks = _split_chunks(content)
+            vectors = load_embedding_model().encode(
+                chunks, batch_size=_ENCODE_BATCH_SIZE, convert_to_numpy=True, normalize_embeddings=True
+            ).astype(np.float32, copy=False)
+            index = self._indexes[knowledge_name] = (content, chunks, vectors)
+            logger.info("Indexed knowledge file %s in %d chunks", knowledge_name, len(chunks))
+        return index
+
+    def _search(self, query: str, documents: Dict[str, str]) -> List[Tuple[str, str]]:
+        """Rank the chunks of every document against the query (blocking)."""
+        query_vector = load_embedding_model().encode(query, normalize_embeddings=True)
+        scored = []
+        for knowledge_name, content in documents.items():
+            _, chunks, vectors = self._get_index(knowledge_name, content)
+            if not chunks:
+                continue
+            similarities = vectors @ query_vector
+            # Only this document's own top K can make the overall top K
+            for idx in np.argsort(similarities)[::-1][:self.top_k]:
+                scored.append((float(similarities[idx]), knowledge_name, chunks[idx]))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [(knowledge_name, chunk) for _, knowledge_name, chunk in scored[:self.top_k]]
+
+    async def search(self, query: str, documents: Dict[str, str]) -> List[Tuple[str, str]]:
+        """
+        Find the knowledge chunks most relevant to a message without blocking the event loop.
+
+        Args:
+            query: The message to find knowledge for
+            documents: Content of each active knowledge file by name
+
+        Returns:
+            Up to top_k (knowledge_name, chunk) pairs, most similar first; empty if retrieval failed
+        """
+        try:
+            return await asyncio.to_thread(self._search, query, documents)
+        except Exception as e:
+            logger.error("Knowledge retrieval failed, sending whole knowledge files: %s", e)
+            self.enabled = False
+            return []
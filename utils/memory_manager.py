@@ -2,17 +2,24 @@
 Memory manager for the AI bot using vector database for semantic search.
 """
 import os
+import re
 import json
+import bisect
+import functools
 import logging
 import time
 import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional, Tuple
 
 # Import conditionally to handle potential missing dependencies
 try:
     import chromadb
+    import numpy as np
     from chromadb.config import Settings
-    from sentence_transformers import SentenceTransformer
+    from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
     VECTOR_DB_AVAILABLE = True
 except ImportError:
     VECTOR_DB_AVAILABLE = False
@@ -29,6 +36,85 @@ from config.config import (
 
 logger = logging.getLogger(__name__)
 
+# Workers that run the conversation search while the calling thread searches knowledge,
+# enough for a few messages handled at once
+_SEARCH_WORKERS = 4
+_search_executor = ThreadPoolExecutor(max_workers=_SEARCH_WORKERS, thread_name_prefix="memory-search")
+
+# Canonical compact encoding of metadata for document IDs, built once instead of per json.dumps call
+_encode_id_metadata = json.JSONEncoder(sort_keys=True, separators=(',', ':')).encode
+
+# Sentence boundaries _split_text prefers to cut at, in order of preference
+_SENTENCE_BOUNDARIES = ('. ', '! ', '? ', '\n')
+
+# Embeddings of recently embedded texts keyed by SHA-256 digest, shared by both collections
+_EMBEDDING_CACHE_SIZE = 4096
+
+class _EmbeddingCache:
+    """Thread-safe LRU of text embeddings (searches run in worker threads)."""
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+    def get(self, key: bytes):
+        """Return the cached embedding for a key, or None."""
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+            return vector
+            
+    def put(self, key: bytes, vector):
+        """Cache an embedding, evicting the least recently used one when full."""
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+_embedding_cache = _EmbeddingCache(_EMBEDDING_CACHE_SIZE)
+
+@functools.lru_cache(maxsize=256)
+def _metadata_filter(username: str = None, channel_id: str = None,
+                     platform: str = None) -> Optional[Dict[str, Any]]:
+    """
+    Build the ChromaDB where filter for a conversation lookup, cached per combination.
+    
+    ChromaDB only accepts "$and" with two or more clauses, so a single clause is
+    returned bare. The returned dict is shared between calls and must not be modified.
+    """
+    clauses = []
+    if username:
+        clauses.append({"username": username})
+    if channel_id:
+        clauses.append({"channel_id": channel_id})
+    if platform:
+        clauses.append({"platform": platform})
+    
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def _format_knowledge_results(results: List[Dict[str, Any]]) -> List[str]:
+    """Format knowledge search results as context lines."""
+    if not results:
+        return []
+    return ["### Información relevante:"] + [
+        f"{idx}. {item['content']} (Fuente: {item['metadata'].get('source', 'desconocido')})"
+        for idx, item in enumerate(results, 1)
+    ]
+
+def _format_conversation_results(results: List[Dict[str, Any]]) -> List[str]:
+    """Format conversation search results as context lines."""
+    if not results:
+        return []
+    return ["\n### Conversación anterior relevante:"] + [
+        f"{'Usuario' if item['metadata'].get('role') == 'user' else 'Asistente'}: {item['content']}"
+        for item in results
+    ]
+
 class MemoryManager:
     """Manager for AI memory using vector databases for semantic search."""
     
@@ -43,7 +129,7 @@ class MemoryManager:
         if not self.enabled:
             if not VECTOR_DB_AVAILABLE:
                 logger.warning("Vector database dependencies not available. Memory features disabled.")
-                logger.warning("Install with: pip install chromadb sentence-transformers")
+                logger.warning("Install with: pip install chromadb")
             else:
                 logger.warning("Vector memory disabled in configuration.")
             return
@@ -52,10 +138,8 @@ class MemoryManager:
         os.makedirs(self.db_path, exist_ok=True)
         
         try:
-            # Initialize embedding model for vectorization
-            self.embedding_model = SentenceTransformer(self.embedding_model_name)
-            
-            # Initialize Chroma client
+            # Initialize Chroma client; texts are embedded by the collections' embedding function
+            # (see _init_collections), so no separate embedding model is loaded here
             self.client = chromadb.PersistentClient(
                 path=self.db_path,
                 settings=Settings(anonymized_telemetry=False)
@@ -64,40 +148,72 @@ class MemoryManager:
             # Initialize collections
             self._init_collections()
             
-            logger.info(f"Memory manager initialized with model: {self.embedding_model_name}")
-            logger.info(f"Using database path: {self.db_path}")
+            logger.info("Memory manager initialized with model: %s", self.embedding_model_name)
+            logger.info("Using database path: %s", self.db_path)
         except Exception as e:
-            logger.error(f"Failed to initialize memory manager: {e}")
+            logger.error("Failed to initialize memory manager: %s", e)
             self.enabled = False
     
     def _init_collections(self):
         """Initialize the collections in the database."""
         try:
+            # Chroma's default embedding function (what existing collections were built with),
+            # held here so texts can be embedded once and the vectors reused across calls
+            self.embedding_function = DefaultEmbeddingFunction()
+            
             # Collection for conversation history
             self.conversations = self.client.get_or_create_collection(
                 name=MEMORY_COLLECTION_CONVERSATIONS,
-                metadata={"description": "Conversation history from all platforms"}
+                metadata={"description": "Conversation history from all platforms"},
+                embedding_function=self.embedding_function
             )
             
             # Collection for knowledge base
             self.knowledge = self.client.get_or_create_collection(
                 name=MEMORY_COLLECTION_KNOWLEDGE,
-                metadata={"description": "Knowledge base from files and curated content"}
+                metadata={"description": "Knowledge base from files and curated content"},
+                embedding_function=self.embedding_function
             )
             
-            logger.info(f"Collections initialized: {MEMORY_COLLECTION_CONVERSATIONS}, {MEMORY_COLLECTION_KNOWLEDGE}")
+            # Document counts tracked locally so an empty collection skips duplicate queries
+            self._collection_counts = {
+                collection.name: collection.count() for collection in (self.conversations, self.knowledge)
+            }
+            
+            logger.info("Collections initialized: %s, %s", MEMORY_COLLECTION_CONVERSATIONS, MEMORY_COLLECTION_KNOWLEDGE)
         except Exception as e:
-            logger.error(f"Failed to initialize collections: {e}")
+            logger.error("Failed to initialize collections: %s", e)
             self.enabled = False
     
+    def _embed(self, texts: List[str]) -> List[Any]:
+        """
+        Embed texts with the collections' embedding function, reusing cached vectors.
+        
+        Args:
+            texts: The texts to embed
+            
+        Returns:
+            One embedding per text
+        """
+        keys = [hashlib.sha256(text.encode()).digest() for text in texts]
+        vectors = [_embedding_cache.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = self.embedding_function([texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+                _embedding_cache.put(keys[i], vector)
+        return vectors
+    
     def _generate_id(self, content: str, metadata: Dict[str, Any] = None) -> str:
         """Generate a unique ID for a piece of content."""
-        # Create a string combining content and metadata
-        metadata_str = json.dumps(metadata, sort_keys=True) if metadata else ""
-        combined = f"{content}|{metadata_str}"
-        
-        # Generate a hash
-        return hashlib.md5(combined.encode()).hexdigest()
+        # Hash content and metadata incrementally instead of building a combined string;
+        # BLAKE2b with a 16-byte digest gives IDs the same length as the former MD5 ones
+        digest = hashlib.blake2b(content.encode(), digest_size=16)
+        digest.update(b"|")
+        if metadata:
+            digest.update(_encode_id_metadata(metadata).encode())
+        return digest.hexdigest()
     
     def store_conversation(self, content: str, username: str, platform: str, 
                           channel_id: str, role: str = "user") -> bool:
@@ -130,22 +246,16 @@ class MemoryManager:
             # Generate a unique ID
             doc_id = self._generate_id(content, metadata)
             
-            # Check if similar content already exists to avoid duplicates
-            if not self._is_duplicate(content, MEMORY_COLLECTION_CONVERSATIONS):
-                # Add to the database
-                self.conversations.add(
-                    documents=[content],
-                    metadatas=[metadata],
-                    ids=[doc_id]
-                )
-                logger.debug(f"Stored conversation: {doc_id[:8]}... from {username} on {platform}")
+            # Add to the database unless similar content already exists
+            if self._add_batch(self.conversations, [content], [metadata], [doc_id]):
+                logger.debug("Stored conversation: %.8s... from %s on %s", doc_id, username, platform)
                 return True
             else:
-                logger.debug(f"Skipped duplicate conversation from {username}")
+                logger.debug("Skipped duplicate conversation from %s", username)
                 return False
                 
         except Exception as e:
-            logger.error(f"Failed to store conversation: {e}")
+            logger.error("Failed to store conversation: %s", e)
             return False
     
     def add_knowledge(self, content: str, source: str, 
@@ -180,22 +290,16 @@ class MemoryManager:
             # Generate a unique ID
             doc_id = self._generate_id(content, meta)
             
-            # Check if similar content already exists
-            if not self._is_duplicate(content, MEMORY_COLLECTION_KNOWLEDGE):
-                # Add to the database
-                self.knowledge.add(
-                    documents=[content],
-                    metadatas=[meta],
-                    ids=[doc_id]
-                )
-                logger.info(f"Added knowledge: {doc_id[:8]}... from {source}")
+            # Add to the database unless similar content already exists
+            if self._add_batch(self.knowledge, [content], [meta], [doc_id]):
+                logger.info("Added knowledge: %.8s... from %s", doc_id, source)
                 return True
             else:
-                logger.debug(f"Skipped duplicate knowledge from {source}")
+                logger.debug("Skipped duplicate knowledge from %s", source)
                 return False
                 
         except Exception as e:
-            logger.error(f"Failed to add knowledge: {e}")
+            logger.error("Failed to add knowledge: %s", e)
             return False
     
     def search_memory(self, query: str, collection_name: str = None, 
@@ -229,45 +333,51 @@ class MemoryManager:
                 # Search both collections if none specified
                 collections = [self.conversations, self.knowledge]
                 
-            # Search each collection
+            # Embed the query once (or reuse a cached embedding) for every collection
+            query_embedding = self._embed([query])[0]
+            
+            # Search each collection, keeping the columns of every result set side by side
+            docs, metadatas, distances, sources = [], [], [], []
             for collection in collections:
                 search_results = collection.query(
-                    query_texts=[query],
+                    query_embeddings=[query_embedding],
                     n_results=max_results,
                     where=filter_metadata
                 )
                 
-                # Process results
-                if search_results and 'documents' in search_results and len(search_results['documents']) > 0:
-                    docs = search_results['documents'][0]  # First query results
-                    metadatas = search_results['metadatas'][0]
-                    distances = search_results['distances'][0] if 'distances' in search_results else [1.0] * len(docs)
-                    
-                    # Filter by similarity threshold and format results
-                    for doc, meta, dist in zip(docs, metadatas, distances):
-                        # Convert distance to similarity (1.0 - distance)
-                        similarity = 1.0 - dist if dist <= 1.0 else 0.0
-                        
-                        if similarity >= self.similarity_threshold:
-                            results.append({
-                                "content": doc,
-                                "metadata": meta,
-                                "similarity": similarity,
-                                "collection": collection.name
-                            })
-            
-            # Sort by similarity (highest first)
-            results.sort(key=lambda x: x['similarity'], reverse=True)
-            
-            # Limit results if needed
-            if max_results and len(results) > max_results:
-                results = results[:max_results]
+                if search_results and search_results.get('documents'):
+                    collection_docs = search_results['documents'][0]  # First query results
+                    docs.extend(collection_docs)
+                    metadatas.extend(search_results['metadatas'][0])
+                    if search_results.get('distances'):
+                        distances.extend(search_results['distances'][0])
+                    else:
+                        distances.extend([1.0] * len(collection_docs))
+                    sources.extend([collection.name] * len(collection_docs))
+            
+            if docs:
+                # Convert distance to similarity (1.0 - distance) and filter by threshold in one pass
+                dist = np.asarray(distances, dtype=np.float64)
+                similarities = np.where(dist <= 1.0, 1.0 - dist, 0.0)
+                kept = np.flatnonzero(similarities >= self.similarity_threshold)
+                
+                # Sort once across all collections (highest first); build dicts only for returned rows
+                order = kept[np.argsort(-similarities[kept], kind="stable")][:max_results]
+                results = [
+                    {
+                        "content": docs[i],
+                        "metadata": metadatas[i],
+                        "similarity": float(similarities[i]),
+                        "collection": sources[i]
+                    }
+                    for i in order.tolist()
+                ]
                 
-            logger.debug(f"Found {len(results)} relevant results for query: {query[:30]}...")
+            logger.debug("Found %d relevant results for query: %.30s...", len(results), query)
             return results
             
         except Exception as e:
-            logger.error(f"Error searching memory: {e}")
+            logger.error("Error searching memory: %s", e)
             return []
     
     def get_relevant_context(self, query: str, username: str = None, 
@@ -287,24 +397,19 @@ class MemoryManager:
         if not self.enabled:
             return ""
             
-        # Format filters correctly for ChromaDB
-        # ChromaDB expects filters in the format {"$and": [{"field": value}, {"field": value}]}
-        # or {"$or": [{"field": value}, {"field": value}]}
-        filters = {"$and": []}
-        
-        if username:
-            filters["$and"].append({"username": username})
-        if channel_id:
-            filters["$and"].append({"channel_id": channel_id})
-        if platform:
-            filters["$and"].append({"platform": platform})
-            
-        # If no filters, set to None
-        if not filters["$and"]:
-            filters = None
-            
-        # Get relevant conversations
-        conv_results = self.search_memory(
+        # Same user and channel on every message, so the filter is usually a cache hit
+        filters = _metadata_filter(username, channel_id, platform)
+            
+        # Embed the query once up front so both searches reuse the cached vector
+        try:
+            self._embed([query])
+        except Exception as e:
+            logger.error("Error searching memory: %s", e)
+            return ""
+            
+        # Get relevant conversations in a worker while this thread searches knowledge
+        conv_future = _search_executor.submit(
+            self.search_memory,
             query=query, 
             collection_name=MEMORY_COLLECTION_CONVERSATIONS,
             filter_metadata=filters,
@@ -317,29 +422,12 @@ class MemoryManager:
             collection_name=MEMORY_COLLECTION_KNOWLEDGE,
             limit=3  # Limit knowledge items
         )
+        conv_results = conv_future.result()
         
-        # Format results
-        context_parts = []
-        
-        # Add knowledge context
-        if knowledge_results:
-            context_parts.append("### Información relevante:")
-            for idx, item in enumerate(knowledge_results):
-                source = item['metadata'].get('source', 'desconocido')
-                context_parts.append(f"{idx+1}. {item['content']} (Fuente: {source})")
-                
-        # Add conversation context
-        if conv_results:
-            context_parts.append("\n### Conversación anterior relevante:")
-            for idx, item in enumerate(conv_results):
-                role = "Usuario" if item['metadata'].get('role') == 'user' else "Asistente"
-                context_parts.append(f"{role}: {item['content']}")
-                
-        # Combine all context
-        if context_parts:
-            return "\n\n".join(context_parts)
-        else:
-            return ""
+        # Format results, knowledge first, and combine them in a single join
+        context_parts = _format_knowledge_results(knowledge_results)
+        context_parts.extend(_format_conversation_results(conv_results))
+        return "\n\n".join(context_parts)
     
     def _is_duplicate(self, content: str, collection_name: str) -> bool:
         """
@@ -355,28 +443,119 @@ class MemoryManager:
         if not self.enabled:
             return False
             
+        collection = getattr(self, collection_name.lower(), None)
+        if not collection:
+            return False
+        return self._find_duplicates([content], collection)[0]
+    
+    def _find_duplicates(self, contents: List[str], collection, embeddings: List[Any] = None) -> List[bool]:
+        """
+        Check several texts against a collection with a single batched query.
+        
+        Args:
+            contents: The texts to check
+            collection: The collection to check against
+            embeddings: Precomputed embeddings of the texts (computed here if omitted)
+            
+        Returns:
+            One flag per text, True if a similar document exists
+        """
+        # Nothing can match in an empty collection, so skip the embedding and the query
+        if self._collection_counts.get(collection.name) == 0:
+            return [False] * len(contents)
+            
         try:
-            # Search for similar content
-            collection = getattr(self, collection_name.lower(), None)
-            if not collection:
-                return False
-                
             results = collection.query(
-                query_texts=[content],
+                query_embeddings=self._embed(contents) if embeddings is None else embeddings,
                 n_results=1
             )
             
             # Check if any results have similarity above threshold
-            if 'distances' in results and results['distances'] and results['distances'][0]:
+            duplicates = []
+            for distances in results.get('distances') or [[] for _ in contents]:
                 # Convert distance to similarity (1.0 - distance)
-                similarity = 1.0 - results['distances'][0][0]
-                return similarity >= self.similarity_threshold
-                
-            return False
+                duplicates.append(bool(distances) and 1.0 - distances[0] >= self.similarity_threshold)
+            return duplicates
             
         except Exception as e:
-            logger.error(f"Error checking for duplicates: {e}")
-            return False
+            logger.error("Error checking for duplicates: %s", e)
+            return [False] * len(contents)
+    
+    def _add_batch(self, collection, documents: List[str], metadatas: List[Dict[str, Any]],
+                   ids: List[str] = None) -> int:
+        """
+        Add documents to a collection in one bulk call, skipping near-duplicates.
+        
+        The duplicate check and the embedding of new documents each run as one batch
+        instead of one round trip per document. Documents are checked against the
+        collection and against the earlier documents of the same batch.
+        
+        Args:
+            collection: The collection to add to
+            documents: The texts to store
+            metadatas: Metadata for each text
+            ids: Precomputed IDs of the texts (generated here if omitted)
+            
+        Returns:
+            Number of documents added
+        """
+        if not documents:
+            return 0
+        if ids is None:
+            ids = [self._generate_id(doc, meta) for doc, meta in zip(documents, metadatas)]
+            
+        # Similar-length texts end up in the same embedding batches, which wastes less padding
+        order = sorted(range(len(documents)), key=lambda i: len(documents[i]))
+        embeddings = [None] * len(documents)
+        for i, embedding in zip(order, self._embed([documents[i] for i in order])):
+            embeddings[i] = embedding
+            
+        # The same embeddings serve the duplicate checks and the insert
+        duplicates = self._find_duplicates(documents, collection, embeddings)
+        self._mark_batch_duplicates(embeddings, duplicates)
+        
+        # Keyed by ID so repeats within the batch are only added once
+        batch = {}
+        for doc_id, doc, meta, embedding, duplicate in zip(ids, documents, metadatas, embeddings, duplicates):
+            if not duplicate:
+                batch.setdefault(doc_id, (doc, meta, embedding))
+                
+        if batch:
+            collection.add(
+                documents=[doc for doc, _, _ in batch.values()],
+                metadatas=[meta for _, meta, _ in batch.values()],
+                embeddings=[embedding for _, _, embedding in batch.values()],
+                ids=list(batch)
+            )
+            self._collection_counts[collection.name] = self._collection_counts.get(collection.name, 0) + len(batch)
+        return len(batch)
+    
+    def _mark_batch_duplicates(self, embeddings: List[Any], duplicates: List[bool]):
+        """
+        Flag documents similar to an earlier kept document of the same batch.
+        
+        Uses the same similarity as the collection check (1.0 - squared L2 distance),
+        so a batch is deduplicated as if its documents had been stored one by one.
+        
+        Args:
+            embeddings: Embedding of each document, in batch order
+            duplicates: Flags from the collection check, updated in place
+        """
+        if len(embeddings) < 2:
+            return
+        kept = np.empty((len(embeddings), len(embeddings[0])), dtype=np.float64)
+        kept_count = 0
+        for i, embedding in enumerate(embeddings):
+            if duplicates[i]:
+                continue
+            vector = np.asarray(embedding, dtype=np.float64)
+            if kept_count:
+                distances = np.square(kept[:kept_count] - vector).sum(axis=1)
+                if 1.0 - distances.min() >= self.similarity_threshold:
+                    duplicates[i] = True
+                    continue
+            kept[kept_count] = vector
+            kept_count += 1
     
     def import_knowledge_from_file(self, file_path: str, category: str = "general",
                                  chunk_size: int = 500, overlap: int = 50) -> Tuple[int, int]:
@@ -406,23 +585,26 @@ class MemoryManager:
             # Split into chunks with overlap for context preservation
             chunks = self._split_text(content, chunk_size, overlap)
             
-            # Add each chunk to the knowledge base
-            success_count = 0
-            for i, chunk in enumerate(chunks):
-                metadata = {
+            # Add all chunks to the knowledge base in one batch
+            timestamp = time.time()
+            metadatas = [
+                {
+                    "source": file_name,
+                    "category": category,
+                    "timestamp": timestamp,
                     "chunk_index": i,
                     "total_chunks": len(chunks),
                     "file_name": file_name
                 }
-                
-                if self.add_knowledge(chunk, source=file_name, category=category, metadata=metadata):
-                    success_count += 1
+                for i in range(len(chunks))
+            ]
+            success_count = self._add_batch(self.knowledge, chunks, metadatas)
                     
-            logger.info(f"Imported {success_count}/{len(chunks)} chunks from {file_name}")
+            logger.info("Imported %d/%d chunks from %s", success_count, len(chunks), file_name)
             return (success_count, len(chunks))
             
         except Exception as e:
-            logger.error(f"Failed to import knowledge from file {file_path}: {e}")
+            logger.error("Failed to import knowledge from file %s: %s", file_path, e)
             return (0, 0)
     
     def _split_text(self, text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
@@ -441,6 +623,12 @@ class MemoryManager:
         if len(text) <= chunk_size:
             return [text]
             
+        # Offsets of every sentence boundary, indexed once per text in preference order
+        boundary_offsets = [
+            (len(boundary), [match.start() for match in re.finditer(re.escape(boundary), text)])
+            for boundary in _SENTENCE_BOUNDARIES
+        ]
+        
         chunks = []
         start = 0
         
@@ -450,11 +638,11 @@ class MemoryManager:
             
             # Adjust for sentence boundaries if possible
             if end < len(text):
-                # Try to end at a sentence boundary
-                for boundary in ['. ', '! ', '? ', '\n']:
-                    pos = text[start:end].rfind(boundary)
-                    if pos > chunk_size // 2:  # Only adjust if we're far enough in
-                        end = start + pos + len(boundary)
+                # Try to end at the last sentence boundary that fits in the chunk
+                for boundary_len, offsets in boundary_offsets:
+                    idx = bisect.bisect_right(offsets, end - boundary_len) - 1
+                    if idx >= 0 and offsets[idx] - start > chunk_size // 2:  # Only adjust if we're far enough in
+                        end = offsets[idx] + boundary_len
                         break
             
             # Add the chunk
@@ -478,25 +666,30 @@ class MemoryManager:
         if not self.enabled:
             return (0, 0)
             
-        success_count = 0
         total_messages = len(messages)
         
+        # Store all messages as conversations in one batch
+        timestamp = time.time()
+        documents = []
+        metadatas = []
         for msg in messages:
             if not msg.get('content'):
                 continue
                 
-            username = msg.get('author', {}).get('name', 'unknown')
-            channel_id = str(msg.get('channel_id', '0'))
-            
-            # Store as conversation
-            if self.store_conversation(
-                content=msg['content'],
-                username=username,
-                platform='discord',
-                channel_id=channel_id,
-                role='user'
-            ):
-                success_count += 1
-                
-        logger.info(f"Imported {success_count}/{total_messages} Discord messages")
+            documents.append(msg['content'])
+            metadatas.append({
+                "username": msg.get('author', {}).get('name', 'unknown'),
+                "platform": 'discord',
+                "channel_id": str(msg.get('channel_id', '0')),
+                "role": 'user',
+                "timestamp": timestamp
+            })
+            
+        try:
+            success_count = self._add_batch(self.conversations, documents, metadatas)
+        except Exception as e:
+            logger.error("Failed to import Discord history: %s", e)
+            return (0, total_messages)
+            
+        logger.info("Imported %d/%d Discord messages", success_count, total_messages)
         return (success_count, total_messages)
\ No newline at end of file
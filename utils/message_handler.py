@@ -1,6 +1,8 @@
+import asyncio
 import logging
 import random
-import asyncio
+import re
+from collections import OrderedDict, deque
 import os
 import glob
 from config.config import (
@@ -13,9 +15,9 @@ from config.config import (
     DISCORD_TOKEN,
     DISCORD_MASTER_USER,
     TWITCH_MASTER_USER,
-    ENABLE_VECTOR_MEMORY,
-    MEMORY_DATABASE_PATH,
-    ENABLE_INTENT_DETECTION
+    ENABLE_INTENT_DETECTION,
+    MEMORY_SIZE,
+    KNOWLEDGE_DIR
 )
 from src.ollama_integration import OllamaClient
 from utils.memory_manager import MemoryManager
@@ -23,10 +25,49 @@ from utils.nlp.intent_detection import IntentDetector
 
 logger = logging.getLogger(__name__)
 
+def _compile_trigger_pattern(phrase):
+    """Build one regex matching the trigger phrase as-is, without '@', or with any spacing."""
+    phrase = phrase.lower()
+    without_at = re.escape(phrase.replace('@', ''))
+    any_spacing = ' *'.join(re.escape(char) for char in phrase.replace(' ', ''))
+    return re.compile(f"{without_at}|{any_spacing}", re.IGNORECASE)
+
+# Compiled once so trigger detection scans each message a single time
+_TRIGGER_RE = _compile_trigger_pattern(AI_TRIGGER_PHRASE)
+
 class MessageHandler:
+    # Commands restricted to the platform master users
+    ADMIN_COMMANDS = frozenset(['persona', 'language', 'languages', 'knowledge', 'knowledges', 'memory', 'intent'])
+    # Knowledge commands get a second admin check before running
+    KNOWLEDGE_COMMANDS = frozenset(['knowledge', 'knowledges'])
+    # Valid priorities for intent guidelines
+    GUIDELINE_PRIORITIES = frozenset(['high', 'medium', 'low'])
+    # Conversations kept in memory; the least recently active one is dropped beyond this
+    MAX_CONVERSATIONS = 1000
+
+    # Shared across Twitch, Discord and console bots so the AI client,
+    # embedding model and intent guidelines are only loaded once per process
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    @classmethod
+    async def aclose(cls):
+        """Close the shared handler's network resources, if the handler was ever created."""
+        if cls._instance is not None and cls._instance._initialized:
+            await cls._instance.ollama_client.aclose()
+
     def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+
         self.ollama_client = OllamaClient()
-        self.conversation_history = {}  # Store conversation history per user/channel
+        self.conversation_history = OrderedDict()  # Store conversation history per user/channel, least recent first
         
         # Initialize the memory manager for vector-based memory
         self.memory_manager = MemoryManager()
@@ -66,20 +107,22 @@ class MessageHandler:
         return f"{username}:{channel_id}"
         
     def store_message(self, username, channel_id, role, content):
-        """Store message in conversation history."""
+        """Store message in conversation history as a chat message ('user' or 'assistant' role)."""
         conv_key = self.get_conversation_key(username, channel_id)
         
-        if conv_key not in self.conversation_history:
-            self.conversation_history[conv_key] = []
+        history = self.conversation_history.get(conv_key)
+        if history is None:
+            # Keep only the last MEMORY_SIZE messages per conversation
+            history = self.conversation_history[conv_key] = deque(maxlen=MEMORY_SIZE)
+            if len(self.conversation_history) > self.MAX_CONVERSATIONS:
+                self.conversation_history.popitem(last=False)
+        else:
+            self.conversation_history.move_to_end(conv_key)
             
-        self.conversation_history[conv_key].append({
+        history.append({
             'role': role,
             'content': content
         })
-        
-        # Limit history to last 20 messages
-        if len(self.conversation_history[conv_key]) > 20:
-            self.conversation_history[conv_key] = self.conversation_history[conv_key][-20:]
     
     def get_conversation_history(self, username, channel_id):
         """Get conversation history for a user/channel."""
@@ -100,10 +143,10 @@ class MessageHandler:
             str or None: Response message if any
         """
         # Store user message in history
-        self.store_message(username, channel_id, 'User', message)
+        self.store_message(username, channel_id, 'user', message)
         
         # Log received message
-        logger.info("Processing message from %s on %s: '%s'", username, platform, message)
+        logger.info("Processing message from %s on %s (%d characters)", username, platform, len(message))
         
         # Get channel name from channel_id (for Discord)
         channel_name = channel_id
@@ -126,11 +169,11 @@ class MessageHandler:
             if intents:
                 # Log detected intents for debugging
                 intent_str = ", ".join([f"{i}:{c:.2f}" for i, c in intents.items()])
-                logger.info(f"Detected intents: {intent_str}")
+                logger.info("Detected intents: %s", intent_str)
                 
             if should_respond and intent_response:
-                logger.info(f"Responding based on intent detection with: {intent_response[:30]}...")
-                self.store_message(username, channel_id, 'Assistant', intent_response)
+                logger.info("Responding based on intent detection with: %.30s...", intent_response)
+                self.store_message(username, channel_id, 'assistant', intent_response)
                 return intent_response
             
         # Explicitly handle Discord messages - ALWAYS process Discord messages for testing
@@ -142,21 +185,16 @@ class MessageHandler:
         # Below handling for non-Discord platforms
         # Enhanced bot name detection for AI trigger
         if ENABLE_AI_RESPONSE:
-            trigger_phrase = AI_TRIGGER_PHRASE.lower()
-            message_lower = message.lower()
-            
             # Debug message content
-            logger.info("Checking message for triggers: '%s'", message)
+            logger.debug("Checking message for triggers: '%s'", message)
             
             # Set default triggering to false
             is_triggered = False
             
             # Check for different variations of the trigger
-            if (trigger_phrase in message_lower or 
-                trigger_phrase.replace('@', '') in message_lower or  # Without @ symbol
-                trigger_phrase.replace(' ', '') in message_lower.replace(' ', '')):  # Without spaces
+            if _TRIGGER_RE.search(message):
                 is_triggered = True
-                logger.info("Triggered by phrase match: '%s'", trigger_phrase)
+                logger.info("Triggered by phrase match: '%s'", AI_TRIGGER_PHRASE)
             
             # Handle mention with bot ID (like <@123456789>)
             if '<@' in message and '>' in message:
@@ -184,8 +222,10 @@ class MessageHandler:
                 channel_id=channel_id
             )
             
-            if should_respond and ai_response:
-                self.store_message(username, channel_id, 'Assistant', ai_response)
+            if should_respond:
+                if not ai_response:
+                    return await self.handle_ai_request(message, username, channel_id, platform)
+                self.store_message(username, channel_id, 'assistant', ai_response)
                 return ai_response
                 
         return None
@@ -193,15 +233,12 @@ class MessageHandler:
     async def handle_command(self, command_text, username, channel_id, platform):
         """Handle bot commands."""
         # Split command and arguments
-        parts = command_text.strip().split(' ', 1)
-        command = parts[0].lower()
+        parts = command_text.strip().split(None, 1)
+        command = parts[0].lower() if parts else ""
         args = parts[1] if len(parts) > 1 else ""
         
-        # Define admin-only commands
-        admin_commands = ['persona', 'language', 'languages', 'knowledge', 'knowledges', 'memory', 'intent']
-        
         # Check if this is an admin command and if the user is authorized
-        if command in admin_commands:
+        if command in self.ADMIN_COMMANDS:
             is_authorized = False
             
             # Check if the user is a master user for their platform
@@ -218,9 +255,10 @@ class MessageHandler:
                 return f"Lo siento, solo los usuarios administradores pueden ejecutar el comando '{command}'."
         
         # Execute the command if it exists
-        if command in self.commands:
+        handler = self.commands.get(command)
+        if handler is not None:
             # Add a double-check for knowledge commands to ensure they're admin-only
-            if command in ['knowledge', 'knowledges']:
+            if command in self.KNOWLEDGE_COMMANDS:
                 # Verify admin status again as an extra security measure
                 is_admin = (platform == 'discord' and username == DISCORD_MASTER_USER) or \
                           (platform == 'twitch' and username == TWITCH_MASTER_USER)
@@ -228,7 +266,7 @@ class MessageHandler:
                     logger.warning("Non-admin user %s attempted to use knowledge command: %s", username, command)
                     return "Lo siento, los comandos de conocimiento son exclusivos para administradores."
             
-            return await self.commands[command](args, username, channel_id, platform)
+            return await handler(args, username, channel_id, platform)
         
         return f"Unknown command: {command}. Type {BOT_PREFIX}help for a list of commands."
     
@@ -326,7 +364,7 @@ class MessageHandler:
                     return f"Invalid intent '{intent}'. Valid intents: {valid_intents}"
                     
                 # Validate priority
-                if priority not in ["high", "medium", "low"]:
+                if priority not in self.GUIDELINE_PRIORITIES:
                     return "Invalid priority. Must be 'high', 'medium', or 'low'."
                     
                 # Add the guideline
@@ -342,7 +380,7 @@ class MessageHandler:
                 else:
                     return "Failed to save guideline. Check logs for details."
             except Exception as e:
-                logger.error(f"Error adding intent guideline: {e}")
+                logger.error("Error adding intent guideline: %s", e)
                 return f"Error: {str(e)}"
                 
         elif action == "test" and len(parts) > 1:
@@ -376,7 +414,7 @@ class MessageHandler:
                     
                 return response
             except Exception as e:
-                logger.error(f"Error testing intent detection: {e}")
+                logger.error("Error testing intent detection: %s", e)
                 return f"Error: {str(e)}"
         else:
             return f"Invalid intent command. Type {BOT_PREFIX}intent for usage information."
@@ -397,10 +435,44 @@ class MessageHandler:
             if hasattr(self, 'intent_detector'):
                 language = args.strip().lower()
                 self.intent_detector.reload_guidelines_for_language(language)
-                logger.info(f"Reloaded intent detection guidelines for language: {language}")
+                logger.info("Reloaded intent detection guidelines for language: %s", language)
         
         return message
 
+    async def _prepare_memory_context(self, clean_message, username, channel_id, platform):
+        """
+        Fetch relevant context for the user message from vector memory, then start storing it.
+        
+        The lookup finishes before the store starts, so the message never comes back as
+        its own context. The store runs in a worker thread while the reply is generated.
+        
+        Returns:
+            A tuple of (memory_context, store_task); await store_task before storing the reply
+            so the two are saved in order (None when vector memory is disabled)
+        """
+        if not self.memory_manager.enabled:
+            return "", None
+            
+        memory_context = await asyncio.to_thread(
+            self.memory_manager.get_relevant_context,
+            query=clean_message,
+            username=username,
+            channel_id=channel_id,
+            platform=platform
+        )
+        store_task = asyncio.ensure_future(asyncio.to_thread(
+            self.memory_manager.store_conversation,
+            content=clean_message,
+            username=username,
+            platform=platform,
+            channel_id=channel_id,
+            role="user"
+        ))
+        
+        if memory_context:
+            logger.info("Found relevant context from memory for query: %s", clean_message[:30])
+        return memory_context, store_task
+
     async def handle_ai_request(self, message, username, channel_id, platform):
         """Handle a direct request to the AI."""
         # Remove the trigger phrase from the message
@@ -408,28 +480,7 @@ class MessageHandler:
         if not clean_message:
             clean_message = "Hello!"
         
-        # Store the user message in vector memory if enabled
-        if self.memory_manager.enabled:
-            self.memory_manager.store_conversation(
-                content=clean_message,
-                username=username,
-                platform=platform, 
-                channel_id=channel_id,
-                role="user"
-            )
-            
-        # Get relevant context from memory if available
-        memory_context = ""
-        if self.memory_manager.enabled:
-            memory_context = self.memory_manager.get_relevant_context(
-                query=clean_message,
-                username=username,
-                channel_id=channel_id,
-                platform=platform
-            )
-            
-            if memory_context:
-                logger.info("Found relevant context from memory for query: %s", clean_message[:30])
+        memory_context, user_store = await self._prepare_memory_context(clean_message, username, channel_id, platform)
                 
         # Generate response with memory-enhanced context
         response = await self.ollama_client.generate_response(
@@ -442,11 +493,13 @@ class MessageHandler:
         )
         
         # Store AI response in history
-        self.store_message(username, channel_id, 'Assistant', response)
+        self.store_message(username, channel_id, 'assistant', response)
         
-        # Store the AI response in vector memory if enabled
-        if self.memory_manager.enabled:
-            self.memory_manager.store_conversation(
+        # Store the AI response in vector memory if enabled, after the user message
+        if user_store is not None:
+            await user_store
+            await asyncio.to_thread(
+                self.memory_manager.store_conversation,
                 content=response,
                 username=username, 
                 platform=platform,
@@ -463,28 +516,7 @@ class MessageHandler:
         if not clean_message:
             clean_message = "Hello!"
         
-        # Store the user message in vector memory if enabled
-        if self.memory_manager.enabled:
-            self.memory_manager.store_conversation(
-                content=clean_message,
-                username=username,
-                platform=platform, 
-                channel_id=channel_id,
-                role="user"
-            )
-            
-        # Get relevant context from memory if available
-        memory_context = ""
-        if self.memory_manager.enabled:
-            memory_context = self.memory_manager.get_relevant_context(
-                query=clean_message,
-                username=username,
-                channel_id=channel_id,
-                platform=platform
-            )
-            
-            if memory_context:
-                logger.info("Found relevant context from memory for query: %s", clean_message[:30])
+        memory_context, user_store = await self._prepare_memory_context(clean_message, username, channel_id, platform)
                 
         # Generate streaming response with memory-enhanced context
         response_generator = self.ollama_client.generate_response_stream(
@@ -496,12 +528,13 @@ class MessageHandler:
             memory_context=memory_context
         )
         
-        # Track the full response to store in history
-        full_response = ""
+        # Track the full response to store in history; pieces are joined once at the end
+        response_parts = []
         
         async for chunk in response_generator:
-            full_response += chunk
+            response_parts.append(chunk)
             yield chunk
+        full_response = "".join(response_parts)
         
         # If we got a complete response back (not just chunks)
         if hasattr(response_generator, 'cr_running') and isinstance(response_generator.cr_running, bool) and not response_generator.cr_running:
@@ -512,13 +545,18 @@ class MessageHandler:
             except (StopAsyncIteration, StopIteration, RuntimeError):
                 pass
         
+        # The user message is saved to vector memory even if there is no reply to store
+        if user_store is not None:
+            await user_store
+            
         # Store AI response in history
         if full_response:
-            self.store_message(username, channel_id, 'Assistant', full_response)
+            self.store_message(username, channel_id, 'assistant', full_response)
             
             # Store the AI response in vector memory if enabled
             if self.memory_manager.enabled:
-                self.memory_manager.store_conversation(
+                await asyncio.to_thread(
+                    self.memory_manager.store_conversation,
                     content=full_response,
                     username=username, 
                     platform=platform,
@@ -529,9 +567,6 @@ class MessageHandler:
     # Command handlers
     async def command_help(self, args, username, channel_id, platform):
         """Help command handler."""
-        # Define admin-only commands for displaying in help
-        admin_commands = ['persona', 'language', 'languages', 'knowledge', 'knowledges', 'memory', 'intent']
-        
         # Check if user is admin
         is_admin = False
         if platform == 'discord' and username == DISCORD_MASTER_USER:
@@ -609,7 +644,7 @@ class MessageHandler:
 
     async def command_ai(self, args, username, channel_id, platform):
         """AI command handler."""
-        if not args:
+        if not args or not args.strip():
             return f"Please provide a message after {BOT_PREFIX}ai"
             
         response = await self.ollama_client.generate_response(
@@ -621,7 +656,7 @@ class MessageHandler:
         )
         
         # Store AI response in history
-        self.store_message(username, channel_id, 'Assistant', response)
+        self.store_message(username, channel_id, 'assistant', response)
         return response
         
     async def command_persona(self, args, username, channel_id, platform):
@@ -662,7 +697,7 @@ class MessageHandler:
         
         # Store response in conversation history
         prefix = f"[{persona.upper()}] "
-        self.store_message(username, channel_id, 'Assistant', prefix + response)
+        self.store_message(username, channel_id, 'assistant', prefix + response)
         
         return prefix + response
         
@@ -751,8 +786,7 @@ class MessageHandler:
         elif action == "import" and len(parts) > 1:
             # Import a file into memory
             file_name = parts[1].strip()
-            knowledge_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "knowledge")
-            file_path = os.path.join(knowledge_dir, file_name)
+            file_path = os.path.join(KNOWLEDGE_DIR, file_name)
             
             if not os.path.exists(file_path):
                 return f"Archivo no encontrado: {file_name}"
@@ -767,7 +801,6 @@ class MessageHandler:
                 
         elif action == "importall":
             # Import all knowledge files
-            knowledge_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "knowledge")
             file_patterns = ['*.txt', '*.md', '*.json']
             
             total_files = 0
@@ -775,7 +808,7 @@ class MessageHandler:
             total_chunks = 0
             
             for pattern in file_patterns:
-                for file_path in glob.glob(os.path.join(knowledge_dir, pattern)):
+                for file_path in glob.glob(os.path.join(KNOWLEDGE_DIR, pattern)):
                     file_name = os.path.basename(file_path)
                     total_files += 1
                     
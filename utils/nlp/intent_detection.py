@@ -1,12 +1,20 @@
+import functools
 import logging
-import re
 import json
 import os
-from typing import Dict, List, Optional, Tuple, Any
-import random
+import orjson
+from typing import Dict, Any
+
+from config.config import KNOWLEDGE_DIR
 
 logger = logging.getLogger(__name__)
 
+@functools.lru_cache(maxsize=8)
+def _read_guidelines_file(path: str, mtime_ns: int) -> bytes:
+    """Read a guidelines JSON file, reusing the bytes until the file's mtime changes."""
+    with open(path, 'rb') as f:
+        return f.read()
+
 class IntentDetector:
     """
     Advanced NLP-based intent detection for Discord messages.
@@ -16,7 +24,7 @@ class IntentDetector:
     def __init__(self):
         self.channel_guidelines: Dict[str, Dict[str, Any]] = {}
         self.default_guidelines: Dict[str, Any] = {}
-        self.knowledge_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "knowledge")
+        self.knowledge_dir = KNOWLEDGE_DIR
         self.loaded = False
         self.current_language = None  # Will be set when guidelines are loaded
         
@@ -162,8 +170,10 @@ class IntentDetector:
             return
             
         try:
-            with open(guidelines_path, 'r', encoding='utf-8') as f:
-                guidelines_data = json.load(f)
+            # Switching languages back and forth reuses the file bytes unless it changed on disk;
+            # they are parsed on every load so each detector gets its own dicts to modify
+            mtime_ns = os.stat(guidelines_path).st_mtime_ns
+            guidelines_data = orjson.loads(_read_guidelines_file(guidelines_path, mtime_ns))
                 
             # Process channel guidelines
             if 'channels' in guidelines_data:
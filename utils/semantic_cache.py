@@ -0,0 +1,150 @@
+"""
+Semantic response cache for the AI bot.
+
+Replies are reused for messages whose embedding is close enough to one that
+was already answered, so repeated chat questions skip the LLM.
+"""
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional
+
+# Import conditionally to handle potential missing dependencies
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+    SEMANTIC_CACHE_AVAILABLE = True
+except ImportError:
+    SEMANTIC_CACHE_AVAILABLE = False
+
+from config.config import (
+    ENABLE_SEMANTIC_CACHE,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_SIZE,
+    MEMORY_EMBEDDING_MODEL
+)
+
+logger = logging.getLogger(__name__)
+
+# Embeddings of recently seen message texts, so repeated messages skip the model
+_EMBEDDING_CACHE_SIZE = 1024
+
+# Prompt configurations kept at once; each preallocates a full-size buffer, and a persona
+# switch or knowledge edit starts a new one, so the least recently used are dropped
+_MAX_SCOPES = 4
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def load_embedding_model():
+    """Load the shared MEMORY_EMBEDDING_MODEL on first use (blocking, thread-safe)."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = SentenceTransformer(MEMORY_EMBEDDING_MODEL)
+            logger.info("Embedding model loaded: %s", MEMORY_EMBEDDING_MODEL)
+    return _model
+
+
+class _CacheScope:
+    """Ring buffer of normalized embeddings and their replies for one prompt configuration."""
+
+    def __init__(self, capacity: int, dim: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.responses: List[Optional[str]] = [None] * capacity
+        self.count = 0
+        self.next = 0
+
+    def lookup(self, vector, threshold: float) -> Optional[str]:
+        """Return the reply of the most similar entry if it reaches the threshold."""
+        if not self.count:
+            return None
+        # Rows are unit vectors, so one matrix-vector product gives every cosine similarity
+        similarities = self.vectors[:self.count] @ vector
+        best = int(similarities.argmax())
+        if similarities[best] >= threshold:
+            return self.responses[best]
+        return None
+
+    def store(self, vector, response: str):
+        """Add an entry, overwriting the oldest one once the buffer is full."""
+        self.vectors[self.next] = vector
+        self.responses[self.next] = response
+        self.next = (self.next + 1) % len(self.responses)
+        self.count = min(self.count + 1, len(self.responses))
+
+
+class SemanticCache:
+    """Cache of LLM replies looked up by cosine similarity of the message embedding."""
+
+    def __init__(self):
+        """Initialize the semantic cache; the embedding model is loaded on first use."""
+        self.enabled = ENABLE_SEMANTIC_CACHE and SEMANTIC_CACHE_AVAILABLE
+        self.threshold = SEMANTIC_CACHE_THRESHOLD
+        self.max_entries = SEMANTIC_CACHE_SIZE
+        self._scopes: "OrderedDict[Hashable, _CacheScope]" = OrderedDict()
+        self._embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+        if ENABLE_SEMANTIC_CACHE and not SEMANTIC_CACHE_AVAILABLE:
+            logger.warning("Semantic cache dependencies not available. Semantic cache disabled.")
+            logger.warning("Install with: pip install numpy sentence-transformers")
+
+    def _encode(self, text: str):
+        """Embed a message as a normalized float32 vector (blocking)."""
+        vector = load_embedding_model().encode(text, normalize_embeddings=True).astype(np.float32, copy=False)
+        vector.setflags(write=False)  # Shared through the embedding cache
+        return vector
+
+    async def embed(self, text: str):
+        """
+        Embed a message without blocking the event loop.
+
+        Returns:
+            The normalized embedding, or None if embedding failed (the cache is then disabled)
+        """
+        vector = self._embeddings.get(text)
+        if vector is not None:
+            self._embeddings.move_to_end(text)
+            return vector
+
+        try:
+            vector = await asyncio.to_thread(self._encode, text)
+        except Exception as e:
+            logger.error("Semantic cache embedding failed, disabling cache: %s", e)
+            self.enabled = False
+            return None
+
+        self._embeddings[text] = vector
+        if len(self._embeddings) > _EMBEDDING_CACHE_SIZE:
+            self._embeddings.popitem(last=False)
+        return vector
+
+    def lookup(self, scope: Hashable, vector) -> Optional[str]:
+        """
+        Find a cached reply for a message embedding.
+
+        Args:
+            scope: Key of the prompt configuration the reply must have been produced under
+            vector: Normalized message embedding from embed()
+
+        Returns:
+            The cached reply, or None on a miss
+        """
+        cache_scope = self._scopes.get(scope)
+        if cache_scope is None:
+            return None
+        self._scopes.move_to_end(scope)
+        return cache_scope.lookup(vector, self.threshold)
+
+    def store(self, scope: Hashable, vector, response: str):
+        """Remember a reply for a message embedding under the given scope."""
+        cache_scope = self._scopes.get(scope)
+        if cache_scope is None:
+            cache_scope = self._scopes[scope] = _CacheScope(self.max_entries, vector.shape[0])
+            if len(self._scopes) > _MAX_SCOPES:
+                self._scopes.popitem(last=False)
+        else:
+            self._scopes.move_to_end(scope)
+        cache_scope.store(vector, response)